@@ -0,0 +1,169 @@
+import json
+import subprocess
+import sys
+from contextlib import redirect_stdout
+from io import StringIO
+from statistics import median
+from tempfile import mkdtemp
+from time import perf_counter
+
+
+###############################################################################
+
+
+# python -m benchmarks.app_profile [games_per_team] [repeat]
+#
+# Compares the app as main.py used to build it (at import: debug, no
+# template cache, database built up front) with the production profile of
+# main.create_app() (template cache, templates precompiled from a bytecode
+# cache, database built by the first request using it). Startup is timed
+# in fresh processes, from importing main to the first /database/games
+# response, once with an empty and once with a filled bytecode cache.
+# Renders are timed per route with the fragment cache cleared.
+#
+# Only the standard library is imported at the top so the child processes
+# time the imports of main themselves.
+
+
+###############################################################################
+
+
+ROUTES = [
+    '/',
+    '/database/games',
+    '/database/stats?game=1',
+    '/info/upcoming_games',
+]
+FIRST_ROUTE = '/database/games'
+
+
+def main():
+    from main import PROFILES
+
+    games_per_team = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+
+    db_dir = build_season(games_per_team)
+    bytecode = mkdtemp(prefix='ltl_templates_')
+    profiles = [
+        ('current', PROFILES['development'], True),
+        ('production', {**PROFILES['production'], 'template_bytecode': bytecode}, False),
+    ]
+
+    print(f'app startup: import main to first {FIRST_ROUTE} response')
+    for label, settings, eager in [
+        profiles[0],
+        ('production, cold bytecode', *profiles[1][1:]),
+        ('production, warm bytecode', *profiles[1][1:]),
+    ]:
+        timings = run_child(settings, db_dir, eager)
+        print(
+            f'\t{label:<28}'
+            f'{timings["import"] * 1000:>9.1f}ms import'
+            f'{timings["create"] * 1000:>9.1f}ms create_app'
+            f'{timings["first"] * 1000:>9.1f}ms first response'
+            f'{sum(timings.values()) * 1000:>9.1f}ms total'
+        )
+
+    print(f'renders: median of {repeat}, fragment cache cleared')
+    for label, settings, eager in profiles:
+        print(f'  {label}')
+        for route, elapsed in time_renders(settings, db_dir, repeat):
+            print(f'\t{route:<28}{elapsed * 1000:>9.3f}ms')
+
+
+def build_season(games_per_team) -> str:
+    from .fixtures import (
+        build_database,
+        seed_boxscores,
+        seed_season,
+        table_map,
+        synthetic_teams,
+        synthetic_schedule
+    )
+    from .suite import midseason
+
+    teams = synthetic_teams()
+    schedule = synthetic_schedule(teams, games_per_team)
+    db = build_database()
+    tables = table_map(db)
+    seed_season(tables, teams, schedule)
+    seed_boxscores(tables, schedule)
+    midseason(db)
+    db_dir = db.teams.db_dir
+    db.close()
+    return db_dir
+
+
+def run_child(settings, db_dir, eager) -> dict:
+    result = subprocess.run(
+        [
+            sys.executable, '-m', 'benchmarks.app_profile',
+            'child', json.dumps(settings), db_dir, str(int(eager))
+        ],
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    return json.loads(result.stdout.splitlines()[-1])
+
+
+def time_renders(settings, db_dir, repeat) -> list[tuple[str, float]]:
+    from main import create_app
+
+    with redirect_stdout(StringIO()):
+        app = create_app(settings, db_dir=db_dir, scheduler=False)
+    api = app.view_functions['games'].__self__
+    client = app.test_client()
+
+    results = []
+    for route in ROUTES:
+        runs = []
+        for _ in range(repeat):
+            api.fragments.clear()
+            start = perf_counter()
+            response = client.get(route)
+            runs.append(perf_counter() - start)
+            assert response.status_code == 200, (route, response.status_code)
+        results.append((route, median(runs)))
+    return results
+
+
+###############################################################################
+
+
+def child(settings, db_dir, eager):
+    # one boot of the app, timed from the import of main
+    with redirect_stdout(StringIO()):
+        start = perf_counter()
+        import main
+        imported = perf_counter()
+
+        app = main.create_app(settings, db_dir=db_dir, scheduler=False)
+        if eager:
+            # main.py used to build the database when it was imported
+            app.view_functions['games'].__self__.db.target
+        created = perf_counter()
+
+        response = app.test_client().get(FIRST_ROUTE)
+        first = perf_counter()
+        assert response.status_code == 200, response.status_code
+
+    print(json.dumps({
+        'import': imported - start,
+        'create': created - imported,
+        'first': first - created
+    }))
+
+
+###############################################################################
+
+
+if __name__ == '__main__':
+    if sys.argv[1:2] == ['child']:
+        child(json.loads(sys.argv[2]), sys.argv[3], sys.argv[4] == '1')
+    else:
+        main()
+
+
+###############################################################################
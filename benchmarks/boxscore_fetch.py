@@ -0,0 +1,70 @@
+from contextlib import redirect_stdout
+from io import StringIO
+from sys import argv
+from time import perf_counter
+
+from database.tables.games import BOXSCORE_WORKERS
+
+from .fake_nhl import FakeNHLServer, SyntheticFixtures
+from .fixtures import (
+    build_tables,
+    seed_season,
+    synthetic_teams,
+    synthetic_schedule
+)
+
+
+###############################################################################
+
+
+# python -m benchmarks.boxscore_fetch [games_per_team] [latency_seconds]
+#
+# Runs an IMPORTED compile pass against a local fake of the NHL api with a
+# fixed per-request latency, once fetching boxscores one at a time and once
+# with the default number of fetch workers.
+
+
+###############################################################################
+
+
+def main():
+    games_per_team = int(argv[1]) if len(argv) > 1 else 10
+    latency = float(argv[2]) if len(argv) > 2 else 0.05
+
+    teams = synthetic_teams()
+    schedule = synthetic_schedule(teams, games_per_team)
+    fixtures = SyntheticFixtures(teams, schedule)
+
+    print(f'boxscore fetch: {len(schedule)} games, {latency * 1000:.0f}ms latency')
+    with FakeNHLServer(fixtures, latency=latency) as server:
+        nhl = server.client()
+        for workers in sorted({1, BOXSCORE_WORKERS}):
+            elapsed = run_compile_pass(nhl, teams, schedule, workers)
+            print(f'\t{workers:>3} workers{elapsed:>10.3f}s')
+
+
+def run_compile_pass(nhl, teams, schedule, workers):
+    tables = build_tables()
+    seed_season(tables, teams, schedule)
+    tables['games'].boxscore_workers = workers
+
+    start = perf_counter()
+    with redirect_stdout(StringIO()):
+        tables['games']._compile_games_by_status(
+            'IMPORTED',
+            nhl,
+            tables['teams'],
+            tables['player_stats'],
+            tables['players']
+        )
+    return perf_counter() - start
+
+
+###############################################################################
+
+
+if __name__ == '__main__':
+    main()
+
+
+###############################################################################
@@ -0,0 +1,104 @@
+import sqlite3
+from contextlib import contextmanager, redirect_stdout
+from io import StringIO
+from sys import argv
+from time import perf_counter
+
+from utils.connections import configure_pools, get_pool, DEFAULT_POOL_SIZE
+
+from .fixtures import (
+    StubNHL,
+    build_tables,
+    seed_season,
+    synthetic_teams,
+    synthetic_schedule
+)
+
+
+###############################################################################
+
+
+# python -m benchmarks.compile_pass [games_per_team]
+#
+# Times one full IMPORTED compile pass of a synthetic season with the
+# tables opening, committing and closing a sqlite3 connection for every
+# statement (the old behavior) and through the shared connection pool.
+# Both run on a database in WAL mode.
+
+
+###############################################################################
+
+
+def main():
+    games_per_team = int(argv[1]) if len(argv) > 1 else 20
+
+    teams = synthetic_teams()
+    schedule = synthetic_schedule(teams, games_per_team)
+    nhl = StubNHL(teams, schedule)
+
+    print(f'compile pass: {len(schedule)} games, {len(teams)} teams')
+    for label, per_statement in [
+        ('connection per statement', True),
+        (f'pooled (size {DEFAULT_POOL_SIZE})', False),
+    ]:
+        elapsed, opened = run_compile_pass(nhl, teams, schedule, per_statement)
+        print(f'\t{label:<28}{elapsed:>8.3f}s\t{opened:>8} connections')
+
+
+def run_compile_pass(nhl, teams, schedule, per_statement=False):
+    configure_pools(size=DEFAULT_POOL_SIZE)
+    tables = build_tables()
+    seed_season(tables, teams, schedule)
+    if per_statement:
+        connections = PerStatementConnections(tables)
+        opened = 0
+    else:
+        opened = get_pool(tables['games'].db_dir).opened
+
+    start = perf_counter()
+    with redirect_stdout(StringIO()):
+        tables['games']._compile_games_by_status(
+            'IMPORTED',
+            nhl,
+            tables['teams'],
+            tables['player_stats'],
+            tables['players']
+        )
+    elapsed = perf_counter() - start
+
+    if per_statement:
+        return elapsed, connections.opened
+    return elapsed, get_pool(tables['games'].db_dir).opened - opened
+
+
+class PerStatementConnections:
+    # SQLiteTable._connection() as it was before the pool, a new connection
+    # for every with block, committed when it ends. Closed right away here
+    # where it used to wait for the garbage collector
+    def __init__(self, tables):
+        self.opened = 0
+        for table in tables.values():
+            table._connection = self._connection_for(table.db_dir)
+
+
+    def _connection_for(self, db_dir):
+        @contextmanager
+        def connection(readonly=False):
+            con = sqlite3.connect(db_dir)
+            self.opened += 1
+            try:
+                with con:
+                    yield con
+            finally:
+                con.close()
+        return connection
+
+
+###############################################################################
+
+
+if __name__ == '__main__':
+    main()
+
+
+###############################################################################
@@ -0,0 +1,92 @@
+from contextlib import redirect_stdout
+from io import StringIO
+from sys import argv
+from time import perf_counter
+
+from utils.connections import configure_pools, get_pool
+
+from .fixtures import (
+    StubNHL,
+    build_tables,
+    seed_season,
+    synthetic_teams,
+    synthetic_schedule
+)
+
+
+###############################################################################
+
+
+# python -m benchmarks.compile_transactions [games_per_team]
+#
+# Times an IMPORTED compile pass with 1, 10 and 100 games committed per
+# transaction and counts the commits, in WAL mode and in the old rollback
+# journal mode where every commit syncs the journal and database to disk.
+# Before games were compiled in one transaction, a pass committed 40 times
+# per game (once per skater line, score, status and stats upsert).
+
+
+###############################################################################
+
+
+BATCH_SIZES = [1, 10, 100]
+MODES = [
+    ('wal', {'journal_mode': 'WAL', 'synchronous': 'NORMAL'}),
+    ('rollback journal', {'journal_mode': 'DELETE', 'synchronous': 'FULL'}),
+]
+
+
+def main():
+    games_per_team = int(argv[1]) if len(argv) > 1 else 10
+
+    teams = synthetic_teams()
+    schedule = synthetic_schedule(teams, games_per_team)
+    nhl = StubNHL(teams, schedule)
+
+    print(f'compile transactions: {len(schedule)} games')
+    for label, settings in MODES:
+        configure_pools(**settings)
+        print(f'  {label}')
+        for batch_size in BATCH_SIZES:
+            elapsed, commits = run_compile_pass(
+                nhl,
+                teams,
+                schedule,
+                batch_size
+            )
+            print(
+                f'\t{batch_size:>4} games/transaction{elapsed:>10.3f}s'
+                f'{commits:>8} commits{commits / len(schedule):>8.2f}/game'
+            )
+
+    configure_pools(journal_mode='WAL', synchronous='NORMAL')
+
+
+def run_compile_pass(nhl, teams, schedule, batch_size):
+    tables = build_tables()
+    seed_season(tables, teams, schedule)
+    games = tables['games']
+    games.games_per_transaction = batch_size
+    pool = get_pool(games.db_dir)
+    commits = pool.commits
+
+    start = perf_counter()
+    with redirect_stdout(StringIO()):
+        games._compile_games_by_status(
+            'IMPORTED',
+            nhl,
+            tables['teams'],
+            tables['player_stats'],
+            tables['players']
+        )
+    return perf_counter() - start, pool.commits - commits
+
+
+###############################################################################
+
+
+if __name__ == '__main__':
+    main()
+
+
+###############################################################################
@@ -0,0 +1,181 @@
+import multiprocessing
+from contextlib import redirect_stdout
+from io import StringIO
+from statistics import median, quantiles
+from sys import argv
+from time import perf_counter, sleep
+
+from utils.connections import configure_pools
+
+from .fixtures import (
+    StubNHL,
+    build_app,
+    build_database,
+    seed_boxscores,
+    seed_season,
+    table_map,
+    synthetic_teams,
+    synthetic_schedule
+)
+
+
+###############################################################################
+
+
+# python -m benchmarks.concurrent_readers [readers] [seconds]
+#
+# Starts reader processes, each polling /database/games through its own
+# app like one gunicorn worker, and measures their latency first on their
+# own and then while another process runs compile passes against the same
+# database file. Runs once in the old rollback journal mode and once in
+# WAL mode.
+
+
+###############################################################################
+
+
+QUERY = '/database/games'
+GAMES_PER_TEAM = 20
+MODES = [
+    ('rollback journal', {'journal_mode': 'DELETE', 'synchronous': 'FULL'}),
+    ('wal', {'journal_mode': 'WAL', 'synchronous': 'NORMAL'}),
+]
+
+
+def main():
+    readers = int(argv[1]) if len(argv) > 1 else 4
+    seconds = float(argv[2]) if len(argv) > 2 else 3
+
+    context = multiprocessing.get_context('spawn')
+    print(f'{QUERY}: {readers} reader processes, {seconds:.0f}s per phase')
+    for label, settings in MODES:
+        db_dir = build_season(settings)
+        print(f'  {label}')
+        for phase, writing in [('idle', False), ('during sync', True)]:
+            latencies, errors, passes = run_phase(
+                context,
+                db_dir,
+                settings,
+                readers,
+                seconds,
+                writing
+            )
+            print_phase(phase, latencies, errors, passes)
+
+
+def build_season(settings) -> str:
+    configure_pools(**settings)
+    teams = synthetic_teams()
+    schedule = synthetic_schedule(teams, GAMES_PER_TEAM)
+    db = build_database()
+    tables = table_map(db)
+    seed_season(tables, teams, schedule)
+    seed_boxscores(tables, schedule)
+    db_dir = db.teams.db_dir
+    db.close()
+    return db_dir
+
+
+def run_phase(context, db_dir, settings, readers, seconds, writing):
+    results = context.Queue()
+    stop = context.Event()
+    processes = [
+        context.Process(
+            target=read_loop,
+            args=(db_dir, settings, stop, results)
+        )
+        for _ in range(readers)
+    ]
+    if writing:
+        processes.append(context.Process(
+            target=write_loop,
+            args=(db_dir, settings, stop, results)
+        ))
+
+    for process in processes:
+        process.start()
+    sleep(seconds)
+    stop.set()
+
+    latencies, errors, passes = [], 0, 0
+    for _ in processes:
+        kind, values, failed = results.get()
+        if kind == 'reader':
+            latencies += values
+        else:
+            passes = values
+        errors += failed
+    for process in processes:
+        process.join()
+    return latencies, errors, passes
+
+
+def print_phase(phase, latencies, errors, passes):
+    if len(latencies) < 2:
+        print(f'\t{phase:<12} no successful requests, {errors} errors')
+        return
+    cuts = quantiles(latencies, n=100)
+    print(
+        f'\t{phase:<12}{len(latencies):>7} requests'
+        f'{median(latencies) * 1000:>9.2f}ms p50'
+        f'{cuts[94] * 1000:>9.2f}ms p95'
+        f'{cuts[98] * 1000:>9.2f}ms p99'
+        f'{errors:>6} errors'
+        f'{passes:>4} sync passes'
+    )
+
+
+###############################################################################
+
+
+def read_loop(db_dir, settings, stop, results):
+    configure_pools(**settings)
+    db = build_database(db_dir=db_dir)
+    app = build_app(db)
+    app.logger.disabled = True
+    api = app.view_functions['games'].__self__
+    client = app.test_client()
+
+    latencies, errors = [], 0
+    while not stop.is_set():
+        # always read the database, never the rendered fragment
+        api.fragments.clear()
+        start = perf_counter()
+        response = client.get(QUERY)
+        if response.status_code == 200:
+            latencies.append(perf_counter() - start)
+        else:
+            errors += 1
+    results.put(('reader', latencies, errors))
+
+
+def write_loop(db_dir, settings, stop, results):
+    # compile passes over the whole season, like a sync catching up
+    configure_pools(**settings)
+    teams = synthetic_teams()
+    schedule = synthetic_schedule(teams, GAMES_PER_TEAM)
+    db = build_database(nhl=StubNHL(teams, schedule), db_dir=db_dir)
+
+    passes, errors = 0, 0
+    while not stop.is_set():
+        try:
+            with db.games._connection() as con:
+                cur = con.cursor()
+                sql = "UPDATE games SET status = 'IMPORTED'"
+                cur.execute(sql)
+            with redirect_stdout(StringIO()):
+                db.update_games_by_status('IMPORTED')
+            passes += 1
+        except Exception:
+            errors += 1
+    results.put(('writer', passes, errors))
+
+
+###############################################################################
+
+
+if __name__ == '__main__':
+    main()
+
+
+###############################################################################
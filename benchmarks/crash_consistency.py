@@ -0,0 +1,132 @@
+import multiprocessing
+import os
+import random
+import signal
+import sqlite3
+from contextlib import redirect_stdout
+from io import StringIO
+from sys import argv, exit
+from time import sleep
+
+from .fixtures import (
+    SKATERS_PER_TEAM,
+    StubNHL,
+    build_database,
+    seed_season,
+    table_map,
+    synthetic_teams,
+    synthetic_schedule
+)
+
+
+###############################################################################
+
+
+# python -m benchmarks.crash_consistency [trials] [games_per_team]
+#
+# Kills a process with SIGKILL part way through an IMPORTED compile pass,
+# then checks the database it left behind: every game is either COMPILED
+# with all of its skater lines, or still IMPORTED with no score and none
+# of them. Exits 1 if any trial finds a half compiled game.
+
+
+###############################################################################
+
+
+LINES_PER_GAME = 2 * SKATERS_PER_TEAM
+# slows the pass down to about PASS_SECONDS for 10 games per team
+NHL_LATENCY = 0.05
+PASS_SECONDS = 1.5
+
+
+def main():
+    trials = int(argv[1]) if len(argv) > 1 else 10
+    games_per_team = int(argv[2]) if len(argv) > 2 else 10
+
+    context = multiprocessing.get_context('spawn')
+    rng = random.Random(0)
+    failures = 0
+    for trial in range(trials):
+        db_dir = build_season(games_per_team)
+        started = context.Event()
+        worker = context.Process(
+            target=compile_pass,
+            args=(db_dir, games_per_team, started)
+        )
+        worker.start()
+
+        # let it get somewhere into the pass before pulling the plug
+        started.wait()
+        sleep(rng.uniform(0, PASS_SECONDS))
+        os.kill(worker.pid, signal.SIGKILL)
+        worker.join()
+
+        compiled, pending, broken = check(db_dir)
+        failures += bool(broken)
+        print(
+            f'\ttrial {trial + 1:>3}:{compiled:>6} compiled{pending:>6} pending'
+            + (f'  HALF COMPILED: {broken}' if broken else '')
+        )
+
+    print(f'{failures} of {trials} trials left half compiled games')
+    exit(1 if failures else 0)
+
+
+def build_season(games_per_team) -> str:
+    teams = synthetic_teams()
+    schedule = synthetic_schedule(teams, games_per_team)
+    db = build_database()
+    seed_season(table_map(db), teams, schedule)
+    db_dir = db.teams.db_dir
+    db.close()
+    return db_dir
+
+
+def compile_pass(db_dir, games_per_team, started):
+    teams = synthetic_teams()
+    schedule = synthetic_schedule(teams, games_per_team)
+    nhl = StubNHL(teams, schedule, latency=NHL_LATENCY)
+    db = build_database(nhl=nhl, db_dir=db_dir)
+    started.set()
+    with redirect_stdout(StringIO()):
+        db.update_games_by_status('IMPORTED')
+
+
+def check(db_dir):
+    # (compiled games, pending games, [rowids of half compiled games])
+    con = sqlite3.connect(db_dir)
+    try:
+        assert con.execute('PRAGMA integrity_check').fetchone()[0] == 'ok'
+        rows = con.execute('''
+            SELECT
+                g.rowid,
+                g.status,
+                g.home_team_points + g.away_team_points,
+                COUNT(s.rowid)
+            FROM games as g
+            LEFT JOIN player_stats as s ON s.game_rowid = g.rowid
+            GROUP BY g.rowid
+        ''').fetchall()
+    finally:
+        con.close()
+
+    compiled = pending = 0
+    broken = []
+    for rowid, status, points, lines in rows:
+        if status == 'COMPILED' and lines == LINES_PER_GAME:
+            compiled += 1
+        elif status == 'IMPORTED' and lines == 0 and points == 0:
+            pending += 1
+        else:
+            broken.append(rowid)
+    return compiled, pending, broken
+
+
+###############################################################################
+
+
+if __name__ == '__main__':
+    main()
+
+
+###############################################################################
@@ -0,0 +1,307 @@
+import json
+import random
+import re
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from sys import argv
+from threading import Thread, Lock
+from time import sleep
+
+import httpx
+from nhlpy import NHLClient
+
+from .fixtures import (
+    synthetic_boxscore,
+    synthetic_franchises,
+    synthetic_schedule,
+    synthetic_standings,
+    synthetic_teams
+)
+
+
+###############################################################################
+
+
+# python -m benchmarks.fake_nhl serve [fixture_dir] [latency] [error_rate]
+# python -m benchmarks.fake_nhl record fixture_dir [season] [boxscores]
+#
+# serve runs the fake on localhost:8765 from recorded fixtures, or from
+# synthetic ones when no directory is given. record downloads the routes
+# the tables use from the live api into fixture_dir.
+
+
+###############################################################################
+
+
+ROUTES = {
+    'boxscore': re.compile(r'^/v1/gamecenter/(\d+)/boxscore$'),
+    'schedule': re.compile(r'^/v1/club-schedule-season/(\w+)/(\d+)$'),
+    'standings': re.compile(r'^/v1/standings/([\w-]+)$'),
+    'franchises': re.compile(r'^/stats/rest/en/franchise$'),
+}
+# teams_info requests absolute urls instead of the configured base url
+HOSTS = ['https://api-web.nhle.com', 'https://api.nhle.com']
+DEFAULT_PORT = 8765
+
+
+###############################################################################
+
+
+class SyntheticFixtures:
+    # generates every response from a synthetic season
+    def __init__(self, teams, schedule):
+        self.teams = teams
+        self.schedule = {game['id']: game for game in schedule}
+
+
+    def route(self, path):
+        if match := ROUTES['boxscore'].match(path):
+            game = self.schedule.get(int(match[1]))
+            return None if game is None else synthetic_boxscore(game)
+
+        if match := ROUTES['schedule'].match(path):
+            code = match[1]
+            return {
+                'games': [
+                    game for game in self.schedule.values()
+                    if code in (
+                        game['homeTeam']['abbrev'],
+                        game['awayTeam']['abbrev']
+                    )
+                ]
+            }
+
+        if ROUTES['standings'].match(path):
+            return synthetic_standings(self.teams)
+
+        if ROUTES['franchises'].match(path):
+            return synthetic_franchises(self.teams)
+
+        return None
+
+
+class RecordedFixtures:
+    # serves json files saved by record(), laid out like the url paths
+    def __init__(self, fixture_dir):
+        self.fixture_dir = Path(fixture_dir)
+
+
+    def route(self, path):
+        if ROUTES['standings'].match(path):
+            # recorded standings answer for any date
+            path = '/v1/standings/now'
+        try:
+            with open(fixture_path(self.fixture_dir, path)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+
+###############################################################################
+
+
+class FakeNHLServer:
+    # serves the api routes the tables use on localhost. Every response is
+    # delayed by latency seconds plus up to jitter seconds, and error_rate
+    # of the requests are answered with error_status instead.
+    def __init__(
+        self,
+        fixtures,
+        latency=0.05,
+        jitter=0.0,
+        error_rate=0.0,
+        error_status=503,
+        seed=0,
+        host='127.0.0.1',
+        port=0
+    ):
+        self.fixtures = fixtures
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.requests = 0
+        self.errors = 0
+
+        self._rng = random.Random(seed)
+        self._lock = Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+
+    def __enter__(self):
+        self.start()
+        return self
+
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+    #------------------------------------------------------#
+
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}'
+
+
+    def start(self):
+        self._thread = Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+    def client(self, timeout=10) -> NHLClient:
+        nhl = NHLClient(timeout=timeout)
+        nhl._config.api_web_base_url = self.base_url
+
+        http = nhl._http_client
+        get_by_url = http.get_by_url
+
+        def local_get_by_url(full_resource, query_params=None):
+            for host in HOSTS:
+                if full_resource.startswith(host):
+                    full_resource = self.base_url + full_resource[len(host):]
+            return get_by_url(full_resource, query_params)
+
+        http.get_by_url = local_get_by_url
+        return nhl
+
+
+    #::::::::::::::::::::::::::::::::::::::::::::::::::::::#
+
+
+    def _roll(self):
+        # (delay, failed) for one request
+        with self._lock:
+            self.requests += 1
+            delay = self.latency + self._rng.uniform(0, self.jitter)
+            failed = self._rng.random() < self.error_rate
+            if failed:
+                self.errors += 1
+        return delay, failed
+
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                delay, failed = server._roll()
+                sleep(delay)
+
+                if failed:
+                    self._respond(server.error_status, {'message': 'injected'})
+                    return
+
+                body = server.fixtures.route(self.path.split('?')[0])
+                if body is None:
+                    self._respond(404, {'message': 'not found'})
+                    return
+                self._respond(200, body)
+
+            def _respond(self, status, body):
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+###############################################################################
+
+
+def fixture_path(fixture_dir, path) -> Path:
+    return Path(fixture_dir, path.lstrip('/') + '.json')
+
+
+def record(fixture_dir, season, boxscores=100, timeout=30):
+    # saves standings, franchises, every club schedule of the season and
+    # the boxscores of the first finished games from the live api
+    fixture_dir = Path(fixture_dir)
+
+    with httpx.Client(timeout=timeout, follow_redirects=True) as client:
+        def save(url, path):
+            response = client.get(url)
+            response.raise_for_status()
+            target = fixture_path(fixture_dir, path)
+            target.parent.mkdir(parents=True, exist_ok=True)
+            target.write_text(response.text)
+            return response.json()
+
+        standings = save(
+            'https://api-web.nhle.com/v1/standings/now',
+            '/v1/standings/now'
+        )
+        save(
+            'https://api.nhle.com/stats/rest/en/franchise',
+            '/stats/rest/en/franchise'
+        )
+
+        finished = {}
+        for team in standings['standings']:
+            path = f'/v1/club-schedule-season/{team["teamAbbrev"]["default"]}/{season}'
+            schedule = save(f'https://api-web.nhle.com{path}', path)
+            for game in schedule['games']:
+                if game['gameType'] == 2 and game['gameState'] == 'OFF':
+                    finished[game['id']] = game
+
+        for game_id in sorted(finished)[:boxscores]:
+            path = f'/v1/gamecenter/{game_id}/boxscore'
+            save(f'https://api-web.nhle.com{path}', path)
+            print(f'recorded {path}')
+
+
+def main():
+    command = argv[1] if len(argv) > 1 else 'serve'
+
+    if command == 'record':
+        year = date.today().year
+        season = argv[3] if len(argv) > 3 else f'{year - 1}{year}'
+        boxscores = int(argv[4]) if len(argv) > 4 else 100
+        record(argv[2], season, boxscores)
+        return
+
+    if len(argv) > 2 and argv[2] != '-':
+        fixtures = RecordedFixtures(argv[2])
+    else:
+        teams = synthetic_teams()
+        fixtures = SyntheticFixtures(teams, synthetic_schedule(teams))
+    latency = float(argv[3]) if len(argv) > 3 else 0.05
+    error_rate = float(argv[4]) if len(argv) > 4 else 0.0
+
+    server = FakeNHLServer(
+        fixtures,
+        latency=latency,
+        error_rate=error_rate,
+        port=DEFAULT_PORT
+    )
+    print(f'fake nhl api on {server.base_url}')
+    try:
+        server._server.serve_forever()
+    except KeyboardInterrupt:
+        server._server.server_close()
+
+
+###############################################################################
+
+
+if __name__ == '__main__':
+    main()
+
+
+###############################################################################
@@ -0,0 +1,309 @@
+import random
+from contextlib import redirect_stdout
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from tempfile import mkdtemp
+from io import StringIO
+from time import sleep
+
+from flask import Flask
+from nhlpy.http_client import ServerErrorException
+
+from database import Database
+from main import create_app
+from utils.dataclasses import Team, Game, Player, PlayerStat
+from version import get_version_number
+
+
+###############################################################################
+
+
+CONFERENCES = {
+    'E': ['A', 'M'],
+    'W': ['C', 'P']
+}
+SEASON_START = datetime(2024, 10, 4, 23, 0, tzinfo=timezone.utc)
+SKATERS_PER_TEAM = 18
+
+
+###############################################################################
+
+
+def synthetic_teams(count=32) -> list[dict]:
+    # shaped like nhl.teams.teams_info()
+    teams = []
+    for i in range(count):
+        conference = 'E' if i < count // 2 else 'W'
+        division = CONFERENCES[conference][i % 2]
+        code = f'T{i:02d}'
+        teams.append({
+            'conference': {'abbr': conference, 'name': conference},
+            'division': {'abbr': division, 'name': division},
+            'name': f'Team {i:02d}',
+            'abbr': code,
+            'franchise_id': i + 1
+        })
+    return teams
+
+
+def synthetic_schedule(teams: list[dict], games_per_team=82) -> list[dict]:
+    # shaped like the 'games' list of nhl.schedule.get_season_schedule()
+    codes = [team['abbr'] for team in teams]
+    rng = random.Random(len(codes) * games_per_team)
+    total = len(codes) * games_per_team // 2
+
+    games = []
+    for i in range(total):
+        home, away = rng.sample(codes, 2)
+        start = SEASON_START + timedelta(days=i // 8, minutes=30 * (i % 8))
+        games.append({
+            'id': 2024020001 + i,
+            'gameType': 2,
+            'gameState': 'OFF',
+            'startTimeUTC': start.strftime('%Y-%m-%dT%H:%M:%SZ'),
+            'homeTeam': {'abbrev': home},
+            'awayTeam': {'abbrev': away}
+        })
+    return games
+
+
+def synthetic_standings(teams: list[dict]) -> dict:
+    # shaped like api-web.nhle.com/v1/standings/{date}
+    return {
+        'standings': [
+            {
+                'conferenceAbbrev': team['conference']['abbr'],
+                'conferenceName': team['conference']['name'],
+                'divisionAbbrev': team['division']['abbr'],
+                'divisionName': team['division']['name'],
+                'teamName': {'default': team['name']},
+                'teamCommonName': {'default': team['name'].split()[-1]},
+                'teamAbbrev': {'default': team['abbr']},
+                'teamLogo': ''
+            }
+            for team in teams
+        ]
+    }
+
+
+def synthetic_franchises(teams: list[dict]) -> dict:
+    # shaped like api.nhle.com/stats/rest/en/franchise
+    return {
+        'data': [
+            {'id': team['franchise_id'], 'fullName': team['name']}
+            for team in teams
+        ]
+    }
+
+
+def synthetic_boxscore(game: dict, state='OFF') -> dict:
+    # shaped like nhl.game_center.boxscore()
+    rng = random.Random(game['id'])
+    home = game['homeTeam']['abbrev']
+    away = game['awayTeam']['abbrev']
+
+    def roster(code):
+        base = 8400000 + int(code[1:]) * 100
+        skaters = [
+            {
+                'playerId': base + n,
+                'name': {'default': f'{code} Skater {n}'},
+                'position': 'D' if n >= 12 else 'CLR'[n % 3],
+                'goals': rng.randint(0, 2),
+                'assists': rng.randint(0, 2),
+                'hits': rng.randint(0, 5),
+                'blockedShots': rng.randint(0, 3),
+                'sog': rng.randint(0, 6)
+            }
+            for n in range(SKATERS_PER_TEAM)
+        ]
+        return {
+            'forwards': skaters[:12],
+            'defense': skaters[12:],
+            'goalies': []
+        }
+
+    return {
+        'id': game['id'],
+        'gameState': state,
+        'homeTeam': {'abbrev': home, 'score': rng.randint(0, 6)},
+        'awayTeam': {'abbrev': away, 'score': rng.randint(0, 6)},
+        'playerByGameStats': {
+            'awayTeam': roster(away),
+            'homeTeam': roster(home)
+        }
+    }
+
+
+###############################################################################
+
+
+class _Namespace:
+    pass
+
+
+class StubNHL:
+    # answers the NHLClient calls the tables make from synthetic data, in
+    # process. Every call can be slowed by latency seconds and fails with a
+    # ServerErrorException at error_rate.
+    def __init__(self, teams, schedule, latency=0.0, error_rate=0.0, seed=0):
+        self._teams = teams
+        self._schedule = {game['id']: game for game in schedule}
+        self.latency = latency
+        self.error_rate = error_rate
+        self.calls = 0
+        self.errors = 0
+        self._rng = random.Random(seed)
+
+        self.teams = _Namespace()
+        self.teams.teams_info = self._call(self._teams_info)
+
+        self.schedule = _Namespace()
+        self.schedule.get_season_schedule = self._call(
+            self._get_season_schedule
+        )
+
+        self.game_center = _Namespace()
+        self.game_center.boxscore = self._call(self._boxscore)
+
+
+    def _call(self, func):
+        def call(*args, **kwargs):
+            self.calls += 1
+            if self.latency:
+                sleep(self.latency)
+            if self._rng.random() < self.error_rate:
+                self.errors += 1
+                raise ServerErrorException(
+                    f'injected error in {func.__name__}',
+                    503
+                )
+            return func(*args, **kwargs)
+        return call
+
+
+    def _teams_info(self, date='now'):
+        return self._teams
+
+
+    def _get_season_schedule(self, team_abbr, season):
+        return {
+            'games': [
+                game for game in self._schedule.values()
+                if team_abbr in (
+                    game['homeTeam']['abbrev'],
+                    game['awayTeam']['abbrev']
+                )
+            ]
+        }
+
+
+    def _boxscore(self, game_id):
+        return synthetic_boxscore(self._schedule[int(game_id)])
+
+
+###############################################################################
+
+
+def build_tables(db_dir=None):
+    return table_map(build_database(db_dir=db_dir))
+
+
+def table_map(db: Database) -> dict:
+    return {
+        'teams': db.teams,
+        'players': db.players,
+        'games': db.games,
+        'player_stats': db.player_stats,
+    }
+
+
+def seed_season(tables, teams, schedule, status='IMPORTED'):
+    for team in teams:
+        tables['teams'].add(Team(
+            team['conference']['abbr'],
+            team['division']['abbr'],
+            team['name'],
+            team['abbr'],
+            team['franchise_id']
+        ))
+
+    rowids = {team.code: team.rowid for team in tables['teams'].read_all()}
+    with tables['games']._connection():
+        for game in schedule:
+            start_time = datetime.strptime(
+                game['startTimeUTC'],
+                '%Y-%m-%dT%H:%M:%SZ'
+            ).timestamp()
+            tables['games'].add(Game(
+                0,
+                game['id'],
+                start_time,
+                status,
+                rowids[game['homeTeam']['abbrev']],
+                rowids[game['awayTeam']['abbrev']]
+            ))
+
+
+def seed_boxscores(tables, schedule):
+    # writes every skater line of the schedule's boxscores in bulk, much
+    # faster than compiling the games one at a time
+    rowids = {team.code: team.rowid for team in tables['teams'].read_all()}
+    games = {game.nhlid: game for game in tables['games'].read_all()}
+
+    players = {}
+    player_stats = []
+    for game in schedule:
+        boxscore = synthetic_boxscore(game)
+        game_rowid = games[game['id']].rowid
+        for side, opp in [('awayTeam', 'homeTeam'), ('homeTeam', 'awayTeam')]:
+            team_rowid = rowids[boxscore[side]['abbrev']]
+            opp_rowid = rowids[boxscore[opp]['abbrev']]
+            roster = boxscore['playerByGameStats'][side]
+            for skater in roster['forwards'] + roster['defense']:
+                players[skater['playerId']] = Player(
+                    skater['playerId'],
+                    team_rowid,
+                    skater['name']['default'],
+                    skater['position']
+                )
+                player_stats.append(PlayerStat(
+                    game_rowid,
+                    skater['playerId'],
+                    team_rowid,
+                    opp_rowid,
+                    skater['goals'],
+                    skater['assists'],
+                    skater['hits'],
+                    skater['blockedShots'],
+                    skater['sog']
+                ))
+
+    with tables['players']._connection():
+        for player in players.values():
+            tables['players'].add(player)
+    tables['player_stats'].upsert_many(player_stats)
+
+
+def build_database(nhl=None, db_dir=None) -> Database:
+    if db_dir is None:
+        db_dir = str(Path(mkdtemp(prefix='ltl_bench_'), 'bench.db'))
+    return Database(get_version_number('code'), nhl, db_dir=db_dir)
+
+
+def build_app(db: Database) -> Flask:
+    # main.create_app() on the database's file, without a sync scheduler.
+    # The app's own Database is built up front so no timed request pays
+    # for it
+    with redirect_stdout(StringIO()):
+        app = create_app(
+            'production',
+            nhl=db.nhl,
+            db_dir=db.teams.db_dir,
+            scheduler=False
+        )
+        app.view_functions['games'].__self__.db.target
+    return app
+
+
+###############################################################################
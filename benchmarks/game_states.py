@@ -0,0 +1,117 @@
+from statistics import median
+from sys import argv
+from time import perf_counter, time
+
+from .fixtures import (
+    build_tables,
+    seed_season,
+    synthetic_teams,
+    synthetic_schedule
+)
+
+
+###############################################################################
+
+
+# python -m benchmarks.game_states [games_per_team] [ticks]
+#
+# Times the check for started games that runs on every sync, for a season
+# that is still all FUT: the old scan that read every FUT game and updated
+# the started ones one by one, against the start time heap and its single
+# batched update. Both are timed on a quiet tick, when no game is due, and
+# on a tick where the first slate of 8 games has started.
+
+
+###############################################################################
+
+
+STARTED_GAMES = 8
+
+
+def main():
+    games_per_team = int(argv[1]) if len(argv) > 1 else 82
+    ticks = int(argv[2]) if len(argv) > 2 else 50
+
+    teams = synthetic_teams()
+    schedule = synthetic_schedule(teams, games_per_team)
+    tables = build_tables()
+    seed_season(tables, teams, schedule, status='FUT')
+    games = tables['games']
+
+    # the first slate starts a minute from now
+    first = min(game.start_time for game in games.read_all())
+    shift_start_times(games, time() + 60 - first)
+
+    print(f'game state check: {len(schedule)} FUT games, {ticks} ticks')
+    quiet = time()
+    # games of a day start 30 minutes apart
+    due = quiet + 60 + 30 * 60 * (STARTED_GAMES - 1)
+    for label, check in [('scan', scan_fut_games), ('heap', start_due_games)]:
+        games.reload_start_times()
+        idle = timed(lambda: check(games, quiet), ticks, games)
+        started = timed(lambda: check(games, due), ticks, games)
+        print(
+            f'\t{label:<6}'
+            f'{median(idle) * 1000:>9.3f}ms quiet tick'
+            f'{median(started) * 1000:>9.3f}ms tick starting '
+            f'{count_live(games)} games'
+        )
+
+
+def timed(func, ticks, games) -> list[float]:
+    runs = []
+    for _ in range(ticks):
+        reset(games)
+        start = perf_counter()
+        func()
+        runs.append(perf_counter() - start)
+    return runs
+
+
+def scan_fut_games(games, now):
+    # update_game_states() before the heap
+    for game in games.read_by_status('FUT'):
+        if not game.is_after(now):
+            game.status = 'LIVE'
+            games.update_status(game)
+
+
+def start_due_games(games, now):
+    games.start_due_games(now)
+
+
+###############################################################################
+
+
+def shift_start_times(games, shift):
+    with games._connection() as con:
+        cur = con.cursor()
+        sql = 'UPDATE games SET start_time = start_time + ?'
+        cur.execute(sql, (shift,))
+
+
+def reset(games):
+    with games._connection() as con:
+        cur = con.cursor()
+        sql = "UPDATE games SET status = 'FUT' WHERE status = 'LIVE'"
+        cur.execute(sql)
+        restarted = cur.rowcount
+    if restarted:
+        # the restarted games are due again, rebuild the heap outside of
+        # the timing like it is built once on boot
+        games.reload_start_times()
+        games.start_due_games(0)
+
+
+def count_live(games) -> int:
+    return len(games.read_by_status('LIVE'))
+
+
+###############################################################################
+
+
+if __name__ == '__main__':
+    main()
+
+
+###############################################################################
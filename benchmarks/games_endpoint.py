@@ -0,0 +1,88 @@
+from sys import argv
+from time import perf_counter
+
+from .fixtures import (
+    build_app,
+    build_database,
+    seed_season,
+    table_map,
+    synthetic_teams,
+    synthetic_schedule
+)
+
+
+###############################################################################
+
+
+# python -m benchmarks.games_endpoint [requests]
+#
+# Load tests /database/games?status=LIVE,FINAL, (the home page table) on
+# growing seasons that always hold the same eight LIVE and FINAL games, so
+# the per-request cost should stay flat as the season grows. The fragment
+# cache is cleared before every timed render so each one queries and
+# renders. Also times conditional requests answered with 304 Not Modified.
+
+
+###############################################################################
+
+
+SEASON_SIZES = [10, 41, 82, 164]
+QUERY = '/database/games?status=LIVE,FINAL,'
+
+
+def main():
+    requests = int(argv[1]) if len(argv) > 1 else 200
+
+    print(f'{QUERY}: {requests} requests per season size')
+    for games_per_team in SEASON_SIZES:
+        rendered, revalidated, games = run_load(games_per_team, requests)
+        print(
+            f'\t{games:>6} games{rendered * 1000:>10.3f}ms/request'
+            f'{revalidated * 1000:>10.3f}ms/304'
+        )
+
+
+def run_load(games_per_team, requests):
+    teams = synthetic_teams()
+    schedule = synthetic_schedule(teams, games_per_team)
+    db = build_database()
+    tables = table_map(db)
+    seed_season(tables, teams, schedule, status='FUT')
+
+    games = tables['games'].read_all()
+    for i, game in enumerate(games[:8]):
+        game.status = 'LIVE' if i % 2 else 'FINAL'
+        tables['games'].update_status(game)
+
+    app = build_app(db)
+    api = app.view_functions['games'].__self__
+    client = app.test_client()
+    etag = client.get(QUERY).headers['ETag']
+
+    rendered = 0
+    for _ in range(requests):
+        api.fragments.clear()
+        start = perf_counter()
+        response = client.get(QUERY)
+        rendered += perf_counter() - start
+        assert response.status_code == 200
+    rendered /= requests
+
+    # a dashboard polling unchanged data revalidates its cached copy
+    start = perf_counter()
+    for _ in range(requests):
+        response = client.get(QUERY, headers={'If-None-Match': etag})
+        assert response.status_code == 304
+    revalidated = (perf_counter() - start) / requests
+
+    return rendered, revalidated, len(games)
+
+
+###############################################################################
+
+
+if __name__ == '__main__':
+    main()
+
+
+###############################################################################
@@ -0,0 +1,83 @@
+from contextlib import redirect_stdout
+from io import StringIO
+from sys import argv
+from tempfile import TemporaryDirectory
+from time import perf_counter
+
+from utils.nhl_cache import CachedNHLClient
+
+from .fake_nhl import FakeNHLServer, SyntheticFixtures
+from .fixtures import (
+    build_tables,
+    seed_season,
+    synthetic_teams,
+    synthetic_schedule
+)
+
+
+###############################################################################
+
+
+# python -m benchmarks.nhl_cache [games_per_team] [latency_seconds]
+#
+# Imports the schedule and compiles every game twice against a local fake
+# of the NHL api, sharing one disk cache. The second run should be served
+# without touching the network.
+
+
+###############################################################################
+
+
+def main():
+    games_per_team = int(argv[1]) if len(argv) > 1 else 10
+    latency = float(argv[2]) if len(argv) > 2 else 0.05
+
+    teams = synthetic_teams()
+    schedule = synthetic_schedule(teams, games_per_team)
+    fixtures = SyntheticFixtures(teams, schedule)
+
+    print(f'nhl cache: {len(schedule)} games, {latency * 1000:.0f}ms latency')
+    with FakeNHLServer(fixtures, latency=latency) as server, \
+            TemporaryDirectory() as cache_dir:
+        nhl = CachedNHLClient(server.client(), cache_dir=cache_dir)
+        for run in ('cold', 'warm'):
+            requests = server.requests
+            elapsed = run_populate(nhl, teams)
+            requests = server.requests - requests
+            print(f'\t{run}{elapsed:>10.3f}s\t{requests} requests')
+
+        stats = nhl.cache.stats
+        print(
+            f'\tcache {stats["entries"]} entries, '
+            f'{stats["bytes"] / 1024:.0f}KiB, '
+            f'hit ratio {stats["hit_ratio"]:.2f}'
+        )
+
+
+def run_populate(nhl, teams):
+    tables = build_tables()
+    seed_season(tables, teams, [])
+    games = tables['games']
+
+    start = perf_counter()
+    with redirect_stdout(StringIO()):
+        games._update_games(nhl, tables['teams'])
+        for status in ('FUT', 'IMPORTED'):
+            games._compile_games_by_status(
+                status,
+                nhl,
+                tables['teams'],
+                tables['player_stats'],
+                tables['players']
+            )
+    return perf_counter() - start
+
+
+###############################################################################
+
+
+if __name__ == '__main__':
+    main()
+
+
+###############################################################################
@@ -0,0 +1,155 @@
+import shutil
+from pathlib import Path
+from sys import argv
+from time import perf_counter
+
+from database.migrations import MigrationRunner
+from database.tables import (
+    TeamsTable,
+    GamesTable,
+    PlayerStatsTable,
+    PlayersTable
+)
+from utils.connections import get_pool
+from version import get_version_number
+
+from .fixtures import (
+    build_tables,
+    seed_season,
+    seed_boxscores,
+    synthetic_teams,
+    synthetic_schedule
+)
+
+
+###############################################################################
+
+
+# python -m benchmarks.read_methods [calls]
+#
+# Builds a season-sized database, copies it with every index dropped (the
+# shape of a data.db from before the migrations), then times each read_by_*
+# method on the copy before and after running the migrations in place.
+
+
+###############################################################################
+
+
+def main():
+    calls = int(argv[1]) if len(argv) > 1 else 200
+
+    teams = synthetic_teams()
+    schedule = synthetic_schedule(teams)
+    tables = build_tables()
+    seed_season(tables, teams, schedule)
+    seed_boxscores(tables, schedule)
+
+    db_dir = str(Path(tables['games'].db_dir).with_name('unindexed.db'))
+    shutil.copy(tables['games'].db_dir, db_dir)
+    drop_indexes(db_dir)
+
+    tables = open_tables(db_dir)
+    cases = read_cases(tables)
+    print(
+        f'read_by_* timings: {len(schedule)} games, '
+        f'{len(tables["player_stats"].read_all())} player_stats rows, '
+        f'{calls} calls each'
+    )
+
+    before = {name: time_calls(func, args, calls) for name, func, args in cases}
+
+    start = perf_counter()
+    MigrationRunner(db_dir).run(get_version_number('code'))
+    print(f'\tmigrations applied in place in {perf_counter() - start:.3f}s\n')
+
+    after = {name: time_calls(func, args, calls) for name, func, args in cases}
+
+    print(f'\t{"method":<44}{"before":>12}{"after":>12}{"speedup":>10}')
+    for name, _, _ in cases:
+        print(
+            f'\t{name:<44}{before[name] * 1e6:>10.1f}us'
+            f'{after[name] * 1e6:>10.1f}us{before[name] / after[name]:>9.1f}x'
+        )
+
+
+###############################################################################
+
+
+def drop_indexes(db_dir):
+    with get_pool(db_dir).connection() as con:
+        cur = con.cursor()
+        sql = '''
+            SELECT name FROM sqlite_master
+            WHERE type='index' AND name NOT LIKE 'sqlite_%'
+        '''
+        cur.execute(sql)
+        for (name,) in cur.fetchall():
+            cur.execute(f'DROP INDEX {name}')
+        cur.execute('DROP TABLE IF EXISTS schema_migrations')
+
+
+def open_tables(db_dir):
+    tables = {
+        'teams': TeamsTable(testing=True),
+        'players': PlayersTable(testing=True),
+        'games': GamesTable(testing=True),
+        'player_stats': PlayerStatsTable(testing=True),
+    }
+    for table in tables.values():
+        table.db_dir = db_dir
+    return tables
+
+
+def read_cases(tables):
+    teams = tables['teams']
+    games = tables['games']
+    players = tables['players']
+    player_stats = tables['player_stats']
+
+    team = teams.read_all()[0]
+    game = games.read_all()[len(games.read_all()) // 2]
+    player = players.read_all()[0]
+
+    # teams.read_by_rowid, _code and _nhlid are served from its cache
+    return [
+        ('teams.read_by_rowid', teams.read_by_rowid, (team.rowid,)),
+        ('teams.read_by_conference', teams.read_by_conference, (team.conference,)),
+        ('teams.read_by_division', teams.read_by_division, (team.division,)),
+        ('teams.read_by_name', teams.read_by_name, (team.name,)),
+        ('teams.read_by_code', teams.read_by_code, (team.code,)),
+        ('teams.read_by_nhlid', teams.read_by_nhlid, (team.nhlid,)),
+        ('games.read_by_rowid', games.read_by_rowid, (game.rowid,)),
+        ('games.read_by_status', games.read_by_status, ('FUT',)),
+        ('games.read_by_start_time', games.read_by_start_time, (game.start_time,)),
+        ('games.read_by_team_rowid', games.read_by_team_rowid, (game.home_team_rowid,)),
+        ('games.read_by_nhlid', games.read_by_nhlid, (game.nhlid,)),
+        ('players.read_by_rowid', players.read_by_rowid, (player.rowid,)),
+        ('players.read_by_team_rowid', players.read_by_team_rowid, (player.team_rowid,)),
+        ('players.read_by_name', players.read_by_name, (player.name,)),
+        ('players.read_by_position', players.read_by_position, (player.position,)),
+        ('players.read_by_nhlid', players.read_by_nhlid, (player.nhlid,)),
+        ('player_stats.read_by_game_rowid', player_stats.read_by_game_rowid, (game.rowid,)),
+        ('player_stats.read_by_player_rowid', player_stats.read_by_player_rowid, (player.nhlid,)),
+        (
+            'player_stats.read_by_player_and_game_rowids',
+            player_stats.read_by_player_and_game_rowids,
+            (player.nhlid, game.rowid)
+        ),
+    ]
+
+
+def time_calls(func, args, calls):
+    start = perf_counter()
+    for _ in range(calls):
+        func(*args)
+    return (perf_counter() - start) / calls
+
+
+###############################################################################
+
+
+if __name__ == '__main__':
+    main()
+
+
+###############################################################################
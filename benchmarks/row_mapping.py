@@ -0,0 +1,79 @@
+from sys import argv
+from time import perf_counter
+
+from utils.dataclasses import PlayerStat
+
+from .fixtures import build_tables
+
+
+###############################################################################
+
+
+# python -m benchmarks.row_mapping [rows]
+#
+# Reads every row of a player_stats table four ways: through the old row
+# factory (a dict per row), through the RowMapper the tables use now, as
+# raw tuples and as columns.
+
+
+###############################################################################
+
+
+def main():
+    rows = int(argv[1]) if len(argv) > 1 else 100_000
+    table = build_tables()['player_stats']
+
+    # 36 skater lines per game, unique per (player, game)
+    table.upsert_many([
+        PlayerStat(
+            i // 36 + 1,
+            8400000 + i,
+            1,
+            2,
+            i % 3,
+            i % 2,
+            i % 5,
+            i % 4,
+            i % 7
+        )
+        for i in range(rows)
+    ])
+
+    def dict_row_factory(cur, row):
+        fields = [column[0] for column in cur.description]
+        as_dict = {key: value for key, value in zip(fields, row)}
+        return PlayerStat(**as_dict)
+
+    def read_with(row_factory):
+        with table._connection() as con:
+            cur = con.cursor()
+            cur.row_factory = row_factory
+            sql = 'SELECT * FROM player_stats'
+            cur.execute(sql)
+            return cur.fetchall()
+
+    print(f'row mapping: {rows} player_stats rows')
+    for label, read in [
+        ('dict per row', lambda: read_with(dict_row_factory)),
+        ('RowMapper', table.read_all),
+        ('tuples', table.read_all_tuples),
+        ('columns', table.read_all_columns),
+    ]:
+        best = min(timed(read) for _ in range(3))
+        print(f'\t{label:<16}{best * 1000:>10.1f}ms{best / rows * 1e9:>10.0f}ns/row')
+
+
+def timed(func):
+    start = perf_counter()
+    func()
+    return perf_counter() - start
+
+
+###############################################################################
+
+
+if __name__ == '__main__':
+    main()
+
+
+###############################################################################
@@ -0,0 +1,70 @@
+from contextlib import redirect_stdout
+from io import StringIO
+from sys import argv
+from time import perf_counter
+
+from database.tables.games import SCHEDULE_WORKERS
+
+from .fake_nhl import FakeNHLServer, SyntheticFixtures
+from .fixtures import (
+    build_tables,
+    seed_season,
+    synthetic_teams,
+    synthetic_schedule
+)
+
+
+###############################################################################
+
+
+# python -m benchmarks.schedule_import [latency_seconds]
+#
+# Imports a synthetic season's schedule into an empty games table from a
+# local fake of the NHL api, once fetching team schedules one at a time and
+# once with the default number of fetch workers.
+
+
+###############################################################################
+
+
+def main():
+    latency = float(argv[1]) if len(argv) > 1 else 0.2
+
+    teams = synthetic_teams()
+    schedule = synthetic_schedule(teams)
+    fixtures = SyntheticFixtures(teams, schedule)
+
+    print(f'schedule import: {len(schedule)} games, {latency * 1000:.0f}ms latency')
+    with FakeNHLServer(fixtures, latency=latency) as server:
+        nhl = server.client()
+        for workers in sorted({1, SCHEDULE_WORKERS}):
+            requests = server.requests
+            elapsed, games = run_import(nhl, teams, workers)
+            requests = server.requests - requests
+            print(
+                f'\t{workers:>3} workers{elapsed:>10.3f}s'
+                f'\t{requests} requests\t{games} games'
+            )
+
+
+def run_import(nhl, teams, workers):
+    tables = build_tables()
+    seed_season(tables, teams, [])
+    tables['games'].schedule_workers = workers
+
+    start = perf_counter()
+    with redirect_stdout(StringIO()):
+        tables['games']._update_games(nhl, tables['teams'])
+    elapsed = perf_counter() - start
+
+    return elapsed, len(tables['games'].read_all())
+
+
+###############################################################################
+
+
+if __name__ == '__main__':
+    main()
+
+
+###############################################################################
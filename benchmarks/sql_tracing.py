@@ -0,0 +1,81 @@
+from statistics import median
+from sys import argv
+from time import perf_counter
+
+from utils.tracing import tracer
+
+from .fixtures import (
+    build_tables,
+    seed_boxscores,
+    seed_season,
+    synthetic_teams,
+    synthetic_schedule
+)
+
+
+###############################################################################
+
+
+# python -m benchmarks.sql_tracing [calls]
+#
+# Times small indexed reads (the read_by_* calls a compile pass makes by
+# the thousand) with tracing off, sampled at 1% and tracing every
+# statement, to show what leaving it on in production costs. The settings
+# take turns over several rounds so drift in the machine's speed is shared
+# between them, and the best and median round are printed.
+
+
+###############################################################################
+
+
+SETTINGS = [
+    ('off', 0.0, None),
+    ('1% sampled, slow log', 0.01, 0.25),
+    ('every statement', 1.0, 0.25),
+]
+ROUNDS = 7
+
+
+def main():
+    calls = int(argv[1]) if len(argv) > 1 else 20_000
+
+    teams = synthetic_teams()
+    schedule = synthetic_schedule(teams, 10)
+    tables = build_tables()
+    seed_season(tables, teams, schedule)
+    seed_boxscores(tables, schedule)
+    players = tables['players']
+    nhlids = [player.nhlid for player in players.read_all()]
+
+    print(
+        f'sql tracing: {calls} PlayersTable.read_by_nhlid calls, '
+        f'{ROUNDS} rounds'
+    )
+    rounds = {label: [] for label, _, _ in SETTINGS}
+    for _ in range(ROUNDS):
+        for label, sample_rate, slow_threshold in SETTINGS:
+            tracer.configure(sample_rate, slow_threshold)
+            tracer.reset()
+
+            start = perf_counter()
+            for i in range(calls):
+                players.read_by_nhlid(nhlids[i % len(nhlids)])
+            rounds[label].append((perf_counter() - start) / calls)
+
+    for label, runs in rounds.items():
+        print(
+            f'\t{label:<24}{min(runs) * 1e6:>8.1f}us/call best'
+            f'{median(runs) * 1e6:>8.1f}us/call median'
+        )
+
+    tracer.configure()
+
+
+###############################################################################
+
+
+if __name__ == '__main__':
+    main()
+
+
+###############################################################################
@@ -0,0 +1,65 @@
+from sys import argv
+from threading import Thread, Barrier
+from time import perf_counter
+
+from utils.hub import Hub, sse_message
+
+
+###############################################################################
+
+
+# python -m benchmarks.sse_fanout [subscribers] [messages]
+#
+# One producer publishes game row updates to a Hub while every subscriber
+# drains its own mailbox on its own thread, like one /stream/games client
+# per thread under gunicorn's gthread worker.
+
+
+###############################################################################
+
+
+def main():
+    subscribers = int(argv[1]) if len(argv) > 1 else 500
+    messages = int(argv[2]) if len(argv) > 2 else 200
+
+    hub = Hub()
+    payload = sse_message('game-1', '<tr><td>LIVE</td></tr>')
+    ready = Barrier(subscribers + 1)
+    received = [0] * subscribers
+
+    def consume(i):
+        subscription = hub.subscribe(maxlen=messages)
+        ready.wait()
+        while received[i] < messages:
+            if subscription.get(5) is None:
+                break
+            received[i] += 1
+        subscription.close()
+
+    threads = [Thread(target=consume, args=(i,)) for i in range(subscribers)]
+    for thread in threads:
+        thread.start()
+    ready.wait()
+
+    start = perf_counter()
+    for _ in range(messages):
+        hub.publish(payload)
+    published = perf_counter() - start
+
+    for thread in threads:
+        thread.join()
+    delivered = perf_counter() - start
+
+    print(f'sse fan-out: {subscribers} subscribers, {messages} messages')
+    print(f'\tpublish   {published / messages * 1e6:>10.1f}us/message')
+    print(f'\tdelivered {delivered:>10.3f}s total, {sum(received)} messages')
+
+
+###############################################################################
+
+
+if __name__ == '__main__':
+    main()
+
+
+###############################################################################
@@ -0,0 +1,229 @@
+import sqlite3
+from pathlib import Path
+from statistics import median
+from sys import argv
+from time import perf_counter
+
+from database import JoinPlayerStatsQuery
+from utils.connections import get_pool
+from utils.dataclasses import JoinPlayerStats
+
+from .fixtures import (
+    build_database,
+    seed_boxscores,
+    seed_season,
+    table_map,
+    synthetic_teams,
+    synthetic_schedule
+)
+
+
+###############################################################################
+
+
+# python -m benchmarks.stats_query [games_per_team] [repeat]
+#
+# Times the /database/stats lookups on a season of player_stats, through
+# get_join_player_stats as it was (the unfiltered five table join executed
+# before the filtered one, results de-duplicated through as_tuple sets by
+# the view) and through JoinPlayerStatsQuery. The old lookups run on a copy
+# of the database without the indexes JoinPlayerStatsQuery came with. Like
+# the old code they only step the unfiltered join to its first row, so the
+# before column leaves out what reading all of it would cost. Prints the
+# query plan of each filter, none of which should scan player_stats.
+
+
+# created by the player_stats_team_indexes migration
+NEW_INDEXES = ['player_stats_team', 'player_stats_opp']
+
+
+###############################################################################
+
+
+def main():
+    games_per_team = int(argv[1]) if len(argv) > 1 else 82
+    repeat = int(argv[2]) if len(argv) > 2 else 50
+
+    teams = synthetic_teams()
+    schedule = synthetic_schedule(teams, games_per_team)
+    db = build_database()
+    tables = table_map(db)
+    seed_season(tables, teams, schedule)
+    seed_boxscores(tables, schedule)
+    before = copy_without_indexes(db.teams.db_dir, NEW_INDEXES)
+
+    line = db.get_join_player_stats()[len(schedule) * 18]
+    rowids = {team.code: team.rowid for team in tables['teams'].read_all()}
+    middle = line.game_start_time
+    print(
+        f'stats query: {len(schedule)} games, '
+        f'{len(tables["player_stats"].read_all())} player_stats'
+    )
+
+    cases = [
+        (
+            'game',
+            lambda: legacy_stats(db, before, game_rowid=line.game_rowid),
+            lambda: JoinPlayerStatsQuery().game_rowid(line.game_rowid)
+        ),
+        (
+            'player',
+            lambda: legacy_stats(db, before, player_nhlid=line.player_nhlid),
+            lambda: JoinPlayerStatsQuery().player_nhlid(line.player_nhlid)
+        ),
+        (
+            'game and player',
+            lambda: legacy_stats(
+                db,
+                before,
+                game_rowid=line.game_rowid,
+                player_nhlid=line.player_nhlid
+            ),
+            lambda: (
+                JoinPlayerStatsQuery()
+                .game_rowid(line.game_rowid)
+                .player_nhlid(line.player_nhlid)
+            )
+        ),
+        (
+            # compared team_code to a rowid before, so it found nothing
+            'team',
+            lambda: legacy_stats(db, before, team_rowid=rowids[line.team_code]),
+            lambda: JoinPlayerStatsQuery().team_codes([line.team_code])
+        ),
+        (
+            'opponent, position',
+            None,
+            lambda: (
+                JoinPlayerStatsQuery()
+                .opp_codes([line.opp_code])
+                .positions(['D'])
+            )
+        ),
+        (
+            'week, top 20 goals',
+            None,
+            lambda: (
+                JoinPlayerStatsQuery()
+                .starts_after(middle)
+                .starts_before(middle + 7 * 24 * 60 * 60)
+                .order_by('goals', descending=True)
+                .limit(20)
+            )
+        ),
+    ]
+
+    for label, legacy, build in cases:
+        rows = len(run_query(db, build()))
+        new = median(timed(lambda: run_query(db, build()), repeat))
+        old = 'n/a' if legacy is None else (
+            f'{median(timed(legacy, repeat)) * 1000:.3f}ms'
+        )
+        print(
+            f'\t{label:<20}{rows:>6} rows'
+            f'{old:>12} before{new * 1000:>9.3f}ms after'
+        )
+        print(f'\t\t{query_plan(db, build())}')
+
+
+def timed(func, repeat) -> list[float]:
+    runs = []
+    for _ in range(repeat):
+        start = perf_counter()
+        func()
+        runs.append(perf_counter() - start)
+    return runs
+
+
+def run_query(db, query):
+    return db.get_join_player_stats(query=query)
+
+
+def query_plan(db, query) -> str:
+    with db._connection(readonly=True) as con:
+        cur = con.cursor()
+        cur.execute(f'EXPLAIN QUERY PLAN {query.sql}', query.params)
+        return '; '.join(row[3] for row in cur.fetchall())
+
+
+###############################################################################
+
+
+def copy_without_indexes(db_dir, indexes) -> str:
+    # a copy of the database as it was before the indexes were created
+    copy = str(Path(db_dir).with_name('before.db'))
+    source = sqlite3.connect(db_dir)
+    target = sqlite3.connect(copy)
+    source.backup(target)
+    for index in indexes:
+        target.execute(f'DROP INDEX {index}')
+    target.commit()
+    source.close()
+    target.close()
+    return copy
+
+
+def legacy_stats(
+    db,
+    db_dir,
+    game_rowid=None,
+    player_nhlid=None,
+    team_rowid=None
+):
+    # get_join_player_stats and the de-duplication of API.stats before
+    # JoinPlayerStatsQuery, on the database at db_dir
+    with get_pool(db_dir).connection(readonly=True) as con:
+        cur = con.cursor()
+        cur.row_factory = db._join_player_stats_row_factory
+        sql = '''
+            SELECT
+                g.rowid as game_rowid,
+                g.start_time as game_start_time,
+                p.nhlid as player_nhlid,
+                t.code as team_code,
+                ot.code as opp_code,
+                p.position as player_position,
+                p.name as player_name,
+                s.goals,
+                s.assists,
+                s.hits,
+                s.blocked_shots,
+                s.shots_on_goal
+            FROM player_stats as s
+            INNER JOIN games as g ON s.game_rowid = g.rowid
+            INNER JOIN teams as t ON s.team_rowid = t.rowid
+            INNER JOIN teams as ot ON s.opp_rowid = ot.rowid
+            INNER JOIN players as p ON s.player_nhlid = p.nhlid
+        '''
+        cur.execute(sql)
+
+        if team_rowid is not None:
+            sql += '\tWHERE team_code = ?'
+            cur.execute(sql, (team_rowid,))
+            stats = cur.fetchall()
+        elif player_nhlid is None:
+            sql += '\tWHERE game_rowid = ?'
+            cur.execute(sql, (game_rowid,))
+            stats = cur.fetchall()
+        elif game_rowid is None:
+            sql += '\tWHERE player_nhlid = ?'
+            cur.execute(sql, (player_nhlid,))
+            stats = cur.fetchall()
+        else:
+            sql += '\tWHERE game_rowid = ? AND player_nhlid = ?'
+            cur.execute(sql, (game_rowid, player_nhlid))
+            stats = [cur.fetchone()]
+
+    stats = {stat.as_tuple for stat in stats}
+    stats = [JoinPlayerStats(*stat) for stat in stats]
+    return sorted(stats, key=lambda stat: stat.team_code)
+
+
+###############################################################################
+
+
+if __name__ == '__main__':
+    main()
+
+
+###############################################################################
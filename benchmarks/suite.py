@@ -0,0 +1,282 @@
+import json
+import platform
+import sqlite3
+from argparse import ArgumentParser
+from contextlib import redirect_stdout
+from io import StringIO
+from statistics import mean, median
+from sys import exit
+from time import perf_counter, time
+
+from version import get_version_number
+
+from .fixtures import (
+    StubNHL,
+    build_app,
+    build_database,
+    seed_season,
+    table_map,
+    synthetic_teams,
+    synthetic_schedule
+)
+
+
+###############################################################################
+
+
+# python -m benchmarks.suite [--games-per-team 82] [--repeat 20]
+#                            [--output run.json] [--baseline base.json]
+#                            [--threshold 0.25]
+#
+# Builds a synthetic season through Database.populate (against StubNHL, so
+# no network is involved) and times populate, update_game_states, every
+# get_join_* query and every route of views/api.py through the Flask test
+# client. --output saves the timings as json, --baseline compares them to
+# an earlier run and exits 1 when a median regressed by more than the
+# threshold. Exits 1 as well when any of the benchmarks raised.
+
+
+###############################################################################
+
+
+# (route, served from the fragment cache)
+ROUTES = [
+    ('/', False),
+    ('/database/games', True),
+    ('/database/games?status=LIVE,FINAL,', True),
+    ('/database/stats', True),
+    ('/info/upcoming_games', False),
+    ('/api/cache_stats', False),
+    ('/api/sync', False),
+]
+# games already started when update_game_states runs
+STARTED_GAMES = 8
+# regressions smaller than this are noise, whatever the ratio
+MIN_REGRESSION = 0.0005
+
+
+###############################################################################
+
+
+def main():
+    parser = ArgumentParser(prog='python -m benchmarks.suite')
+    parser.add_argument('--games-per-team', type=int, default=82)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--output')
+    parser.add_argument('--baseline')
+    parser.add_argument('--threshold', type=float, default=0.25)
+    args = parser.parse_args()
+
+    teams = synthetic_teams()
+    schedule = synthetic_schedule(teams, args.games_per_team)
+    results = {}
+
+    db = bench_populate(results, teams, schedule)
+    midseason(db)
+    bench_update_game_states(results, teams, schedule, args.repeat)
+    bench_queries(results, db, args.repeat)
+    bench_routes(results, db, args.repeat)
+
+    report = {
+        'meta': {
+            'version': get_version_number('code').as_str,
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'teams': len(teams),
+            'games': len(schedule),
+            'player_stats': len(db.player_stats.read_all()),
+            'repeat': args.repeat,
+            'timestamp': time()
+        },
+        'results': results
+    }
+    print_report(report)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f'\nsaved {args.output}')
+
+    failed = [name for name, result in results.items() if 'error' in result]
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if compare(baseline, report, args.threshold):
+            exit(1)
+    if failed:
+        print(f'\n{len(failed)} failed: {", ".join(failed)}')
+        exit(1)
+
+
+#------------------------------------------------------#
+
+
+def bench_populate(results, teams, schedule):
+    db = build_database(nhl=StubNHL(teams, schedule))
+    results['populate'] = timed(lambda: quietly(db.populate), 1)
+    return db
+
+
+def bench_update_game_states(results, teams, schedule, repeat):
+    # a season that has not started yet, except for its first few games
+    db = build_database(nhl=StubNHL(teams, schedule))
+    seed_season(table_map(db), teams, schedule, status='FUT')
+    started = schedule[STARTED_GAMES - 1]['id']
+
+    with db.games._connection() as con:
+        cur = con.cursor()
+        sql = 'SELECT start_time FROM games WHERE nhlid = ?'
+        cur.execute(sql, (started,))
+        shift = time() - cur.fetchone()[0]
+        sql = 'UPDATE games SET start_time = start_time + ?'
+        cur.execute(sql, (shift,))
+
+    def reset():
+        with db.games._connection() as con:
+            cur = con.cursor()
+            sql = "UPDATE games SET status = 'FUT'"
+            cur.execute(sql)
+        db.games.reload_start_times()
+
+    results['update_game_states'] = timed(
+        lambda: quietly(db.update_game_states),
+        repeat,
+        setup=reset
+    )
+
+
+def bench_queries(results, db, repeat):
+    game = db.games.read_all()[0]
+    player = db.players.read_all()[0]
+    queries = {
+        'get_join_players': lambda: db.get_join_players(),
+        'get_join_players(team)': lambda: db.get_join_players(
+            team_rowid=game.home_team_rowid
+        ),
+        'get_join_games': lambda: db.get_join_games(),
+        'get_join_games(team)': lambda: db.get_join_games(
+            team_rowid=game.home_team_rowid
+        ),
+        'get_join_player_stats': lambda: db.get_join_player_stats(),
+        'get_join_player_stats(game)': lambda: db.get_join_player_stats(
+            game_rowid=game.rowid
+        ),
+        'get_join_player_stats(player)': lambda: db.get_join_player_stats(
+            player_nhlid=player.nhlid
+        ),
+    }
+    for name, query in queries.items():
+        results[name] = timed(query, repeat)
+
+
+def bench_routes(results, db, repeat):
+    app = build_app(db)
+    api = app.view_functions['games'].__self__
+    client = app.test_client()
+
+    def get(route):
+        response = client.get(route)
+        assert response.status_code == 200, (route, response.status_code)
+
+    for route, cached in ROUTES:
+        results[f'GET {route}'] = timed(
+            lambda: quietly(get, route),
+            repeat,
+            setup=api.fragments.clear
+        )
+        if cached:
+            results[f'GET {route} (cached)'] = timed(
+                lambda: quietly(get, route),
+                repeat
+            )
+
+
+###############################################################################
+
+
+def midseason(db):
+    # moves the populated season so its second half is still to be played
+    with db.games._connection() as con:
+        cur = con.cursor()
+        sql = 'SELECT start_time FROM games ORDER BY start_time, rowid'
+        cur.execute(sql)
+        start_times = [row[0] for row in cur.fetchall()]
+        middle = start_times[len(start_times) // 2]
+
+        sql = 'UPDATE games SET start_time = start_time + ?'
+        cur.execute(sql, (time() - middle,))
+        sql = "UPDATE games SET status = 'FUT' WHERE start_time > ?"
+        cur.execute(sql, (time(),))
+
+
+def timed(func, repeat, setup=None) -> dict:
+    runs = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = perf_counter()
+        try:
+            func()
+        except Exception as e:
+            return {'error': f'{type(e).__name__}: {e}'}
+        runs.append(perf_counter() - start)
+    return {
+        'min': min(runs),
+        'median': median(runs),
+        'mean': mean(runs),
+        'runs': len(runs)
+    }
+
+
+def quietly(func, *args):
+    with redirect_stdout(StringIO()):
+        return func(*args)
+
+
+def print_report(report):
+    meta = report['meta']
+    print(
+        f'light_the_lamp v{meta["version"]}: {meta["games"]} games, '
+        f'{meta["player_stats"]} player_stats, sqlite {meta["sqlite"]}'
+    )
+    width = max(len(name) for name in report['results'])
+    for name, result in report['results'].items():
+        if 'error' in result:
+            print(f'\t{name:<{width}}  {result["error"]}')
+            continue
+        print(
+            f'\t{name:<{width}}'
+            f'{result["median"] * 1000:>12.3f}ms median'
+            f'{result["min"] * 1000:>12.3f}ms min'
+        )
+
+
+def compare(baseline, report, threshold) -> list[str]:
+    regressions = []
+    print(f'\ncompared to {baseline["meta"]["version"]} ({threshold:.0%} threshold)')
+    width = max(len(name) for name in report['results'])
+    for name, result in report['results'].items():
+        before = baseline['results'].get(name)
+        if before is None or 'median' not in before or 'median' not in result:
+            continue
+
+        change = result['median'] / before['median'] - 1
+        regressed = (
+            change > threshold
+            and result['median'] - before['median'] > MIN_REGRESSION
+        )
+        flag = 'REGRESSED' if regressed else ''
+        print(f'\t{name:<{width}}{change:>+9.1%}  {flag}')
+        if regressed:
+            regressions.append(name)
+    return regressions
+
+
+###############################################################################
+
+
+if __name__ == '__main__':
+    main()
+
+
+###############################################################################
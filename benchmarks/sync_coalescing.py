@@ -0,0 +1,127 @@
+import multiprocessing
+from contextlib import redirect_stdout
+from io import StringIO
+from sys import argv
+from threading import Barrier, Thread
+from time import perf_counter
+
+from .fixtures import (
+    StubNHL,
+    build_database,
+    seed_season,
+    table_map,
+    synthetic_teams,
+    synthetic_schedule
+)
+
+
+###############################################################################
+
+
+# python -m benchmarks.sync_coalescing [threads] [processes]
+#
+# Fires overlapping Database.sync() calls at a season with LIVE games, from
+# threads sharing one Database and from separate processes sharing one
+# database file, and counts the boxscores fetched. Coalesced, each burst
+# costs about one sync's worth of requests however many callers join in.
+
+
+###############################################################################
+
+
+GAMES_PER_TEAM = 4
+LIVE_GAMES = 16
+NHL_LATENCY = 0.05
+
+
+def main():
+    threads = int(argv[1]) if len(argv) > 1 else 16
+    processes = int(argv[2]) if len(argv) > 2 else 4
+
+    print(f'sync coalescing: {LIVE_GAMES} LIVE games')
+
+    db, nhl = build_season()
+    elapsed = burst_threads(db, threads)
+    print(
+        f'\t{threads:>3} threads  {elapsed:>8.3f}s'
+        f'{nhl.calls:>6} boxscores\t{db.sync_flight.stats}'
+    )
+
+    db, _ = build_season()
+    context = multiprocessing.get_context('spawn')
+    barrier = context.Barrier(processes + 1)
+    results = context.Queue()
+    workers = [
+        context.Process(
+            target=sync_process,
+            args=(db.teams.db_dir, barrier, results)
+        )
+        for _ in range(processes)
+    ]
+    for worker in workers:
+        worker.start()
+    barrier.wait()
+    start = perf_counter()
+    calls, stats = 0, []
+    for _ in workers:
+        process_calls, process_stats = results.get()
+        calls += process_calls
+        stats.append(process_stats)
+    elapsed = perf_counter() - start
+    for worker in workers:
+        worker.join()
+
+    shared = sum(s['shared_across_processes'] for s in stats)
+    print(
+        f'\t{processes:>3} processes{elapsed:>8.3f}s'
+        f'{calls:>6} boxscores\t{shared} shared across processes'
+    )
+
+
+def build_season(db_dir=None):
+    teams = synthetic_teams()
+    schedule = synthetic_schedule(teams, GAMES_PER_TEAM)
+    nhl = StubNHL(teams, schedule, latency=NHL_LATENCY)
+    db = build_database(nhl=nhl, db_dir=db_dir)
+    if db_dir is None:
+        seed_season(table_map(db), teams, schedule, status='COMPILED')
+        with db.games._connection() as con:
+            cur = con.cursor()
+            sql = "UPDATE games SET status = 'LIVE' WHERE rowid <= ?"
+            cur.execute(sql, (LIVE_GAMES,))
+    return db, nhl
+
+
+def burst_threads(db, threads):
+    barrier = Barrier(threads)
+
+    def sync():
+        barrier.wait()
+        db.sync()
+
+    workers = [Thread(target=sync) for _ in range(threads)]
+    start = perf_counter()
+    with redirect_stdout(StringIO()):
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+    return perf_counter() - start
+
+
+def sync_process(db_dir, barrier, results):
+    db, nhl = build_season(db_dir)
+    barrier.wait()
+    with redirect_stdout(StringIO()):
+        db.sync()
+    results.put((nhl.calls, db.sync_flight.stats))
+
+
+###############################################################################
+
+
+if __name__ == '__main__':
+    main()
+
+
+###############################################################################
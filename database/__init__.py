@@ -1 +1,2 @@
 from .database import Database
+from .queries import JoinGamesQuery, JoinPlayerStatsQuery
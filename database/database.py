@@ -4,6 +4,8 @@ from time import time
 
 from nhlpy import NHLClient
 
+from .migrations import MigrationRunner
+from .queries import JoinGamesQuery, JoinPlayerStatsQuery
 from .tables import (
     TeamsTable,
     GamesTable,
@@ -15,6 +17,10 @@ from .tables import (
     UserMatchupsTable
 )
 
+from utils.connections import get_pool, close_pools
+from utils.metrics import sync_duration
+from utils.rows import RowMapper
+from utils.singleflight import SingleFlight
 from utils.dataclasses import (
     JoinGame,
     JoinPlayerStats
@@ -31,8 +37,13 @@ class Database:
         version_number: VersionNumber,
         nhl: NHLClient,
         testing=False,
+        db_dir=None
     ):
         self.nhl = nhl
+        self.version_number = version_number
+        self.sync_report = {}
+        self._join_game_row_factory = RowMapper(JoinGame)
+        self._join_player_stats_row_factory = RowMapper(JoinPlayerStats)
 
         results = StringIO() if testing else None
 
@@ -55,6 +66,11 @@ class Database:
             # self.user_stats,
             # self.user_matchups
         ]
+        if db_dir is not None:
+            for table in self.build_sequence:
+                table.db_dir = db_dir
+        self.migrations = MigrationRunner(self.teams.db_dir)
+        self.sync_flight = SingleFlight(f'{self.teams.db_dir}.sync.lock')
 
         if testing:
             try:
@@ -82,9 +98,19 @@ class Database:
                     raise e
             if testing:
                 results.write(f'\n\ninitializing {table._table_name} table')
+
+        # indexes and constraints are added to new and existing databases
+        self.migrations.run(self.version_number, results)
+
+        if testing:
+            for table in self.build_sequence:
                 table._test(results)
 
 
+    def close(self):
+        close_pools()
+
+
     def populate(self):
         print('\n\tPOPULATING DATABASE\n')
 
@@ -115,13 +141,16 @@ class Database:
         # print('\n\n')
 
 
-    def update_game_states(self):
-        games = self.games.read_by_status('FUT')
+    def sync(self):
+        # overlapping syncs, from other threads or other processes using
+        # this database file, wait for the one in flight and share its result
+        result = self.sync_flight.do(self._sync)
+        self.sync_report = result['report']
+        return result['live']
 
-        for game in games:
-            if not game.is_after(time()):
-                game.status = 'LIVE'
-                self.games.update_status(game)
+
+    def update_game_states(self):
+        self.games.start_due_games(time())
 
         if live := self.games.read_by_status('LIVE') != []:
             self.update_games_by_status('LIVE')
@@ -130,17 +159,21 @@ class Database:
 
 
     def update_games_by_status(self, status):
-        self.games._compile_games_by_status(
-            status,
-            self.nhl,
-            self.teams,
-            self.player_stats,
-            self.players
-        )
+        # written vs skipped games and skater lines, kept per status
+        with sync_duration.time(stage=f'compile_{status}'):
+            report = self.games._compile_games_by_status(
+                status,
+                self.nhl,
+                self.teams,
+                self.player_stats,
+                self.players
+            )
+        self.sync_report[status] = report
+        return report
 
 
     def get_join_players(self, player_rowid=None, team_rowid=None):
-        with sqlite3.connect(self.teams.db_dir) as con:
+        with self._connection(readonly=True) as con:
             cur = con.cursor()
             sql = '''
                 SELECT
@@ -176,128 +209,60 @@ class Database:
         game_rowid=None,
         team_rowid=None,
         home_team_rowid=None,
-        away_team_rowid=None
+        away_team_rowid=None,
+        query: JoinGamesQuery | None = None
         ):
-        with sqlite3.connect(self.games.db_dir) as con:
-            cur = con.cursor()
-            cur.row_factory = self._join_game_row_factory
-            sql = '''
-                SELECT 
-                    g.rowid,
-                    g.status,
-                    ht.code as ht_code,
-                    g.home_team_points as ht_points,
-                    at.code as at_code,
-                    g.away_team_points as at_points,
-                    g.start_time
-                FROM games as g
-                INNER JOIN teams as ht ON g.home_team_rowid = ht.rowid
-                INNER JOIN teams as at ON g.away_team_rowid = at.rowid
-            '''
-
+        # every filter given is combined with AND, pass a JoinGamesQuery
+        # for status, team code, date range, ordering and paging filters
+        if query is None:
+            query = JoinGamesQuery()
         if game_rowid is not None:
-            sql += '\tWHERE g.rowid=?'
-            cur.execute(sql, (game_rowid,))
-            return cur.fetchone()
-
+            query.game_rowid(game_rowid)
         if team_rowid is not None:
-            sql += '\tWHERE ht.rowid=? OR at.rowid=?'
-            cur.execute(sql, (team_rowid, team_rowid))
-            return cur.fetchall()
+            query.team_rowid(team_rowid)
+        if home_team_rowid is not None:
+            query.home_team_rowid(home_team_rowid)
+        if away_team_rowid is not None:
+            query.away_team_rowid(away_team_rowid)
 
-        match (
-            home_team_rowid is None,
-            away_team_rowid is None
-        ):
-            case (True, True):
-                cur.execute(sql)
-                return cur.fetchall()
-
-            case (False, False):
-                sql += '\tWHERE ht.rowid=? AND at.rowid=?'
-                cur.execute(sql, (home_team_rowid, away_team_rowid))
-                return cur.fetchall()
-
-            case (False, True):
-                sql += '\tWHERE ht.rowid=?'
-                cur.execute(sql, (home_team_rowid,))
-                return cur.fetchall()
+        with self._connection(readonly=True) as con:
+            cur = con.cursor()
+            cur.row_factory = self._join_game_row_factory
+            cur.execute(query.sql, query.params)
 
-            case (True, False):
-                sql += '\tWHERE at.rowid=?'
-                cur.execute(sql, (away_team_rowid,))
-                return cur.fetchall()
+            if game_rowid is not None:
+                return cur.fetchone()
+            return cur.fetchall()
 
 
     def get_join_player_stats(
         self,
         game_rowid=None,
         player_nhlid=None,
-        team_rowid=None
+        team_rowid=None,
+        query: JoinPlayerStatsQuery | None = None
     ):
-        with sqlite3.connect(self.player_stats.db_dir) as con:
+        # every filter given is combined with AND in one statement, pass a
+        # JoinPlayerStatsQuery for opponent, position, date range, ordering
+        # and paging filters
+        if query is None:
+            query = JoinPlayerStatsQuery()
+        if game_rowid is not None:
+            query.game_rowid(game_rowid)
+        if player_nhlid is not None:
+            query.player_nhlid(player_nhlid)
+        if team_rowid is not None:
+            query.team_rowid(team_rowid)
+
+        with self._connection(readonly=True) as con:
             cur = con.cursor()
             cur.row_factory = self._join_player_stats_row_factory
-            sql = '''
-                SELECT
-                    g.rowid as game_rowid,
-                    g.start_time as game_start_time,
-                    p.nhlid as player_nhlid,
-                    t.code as team_code,
-                    ot.code as opp_code,
-                    p.position as player_position,
-                    p.name as player_name,
-                    s.goals,
-                    s.assists,
-                    s.hits,
-                    s.blocked_shots,
-                    s.shots_on_goal
-                FROM player_stats as s
-                INNER JOIN games as g ON s.game_rowid = g.rowid
-                INNER JOIN teams as t ON s.team_rowid = t.rowid
-                INNER JOIN teams as ot ON s.opp_rowid = ot.rowid
-                INNER JOIN players as p ON s.player_nhlid = p.nhlid
-            '''
-            cur.execute(sql)
-            
-            match (
-                game_rowid is None,
-                player_nhlid is None,
-                team_rowid is None
-            ):
-                case (True, True, True):
-                    cur.execute(sql)
-                    return cur.fetchall()
-
-                case (False, True, True):
-                    sql += '\tWHERE game_rowid = ?'
-                    cur.execute(sql, (game_rowid,))
-                    return cur.fetchall()
+            cur.execute(query.sql, query.params)
 
-                case (True, True, False):
-                    sql += '\tWHERE team_code = ?'
-                    cur.execute(sql, (team_rowid,))
-                    return cur.fetchall()
-
-                case (True, False, True):
-                    sql += '\tWHERE player_nhlid = ?'
-                    cur.execute(sql, (player_nhlid,))
-                    return cur.fetchall()
-
-                case (True, False, False):
-                    sql += '\tWHERE team_code = ? AND player_nhlid = ?'
-                    cur.execute(sql, (team_code, player_nhlid))
-                    return cur.fetchall()
-
-                case (False, True, False):
-                    sql += '\tWHERE game_rowid = ? AND team_code = ?'
-                    cur.execute(sql, (game_rowid, team_code))
-                    return cur.fetchall()
-
-                case (False, False, True) | (False, False, False):
-                    sql += '\tWHERE game_rowid = ? AND player_nhlid = ?'
-                    cur.execute(sql, (game_rowid, player_nhlid))
-                    return cur.fetchone()
+            # one line per player and game
+            if game_rowid is not None and player_nhlid is not None:
+                return cur.fetchone()
+            return cur.fetchall()
 
 
     #::::::::::::::::::::::::::::::::::::::::::::::::::::::# 
@@ -307,7 +272,7 @@ class Database:
         results.write(f'\n\n\tSTARTING DATABASE INTEGRATION TEST\n\tFOR LIGHT_THE_LAMP v{version_number.as_str}\n\n')
         teardown_sequence = self.build_sequence[::1]
         for table in teardown_sequence:
-            with sqlite3.connect(table.db_dir) as con:
+            with table._connection() as con:
                 cur = con.cursor()
                 sql = f'DROP TABLE {table._table_name}'
                 try:
@@ -322,21 +287,26 @@ class Database:
                         raise e
                 else:
                     results.write(f'\ndropped table: test.{table._table_name}')
+        self.migrations.reset()
         self.init(testing=True, results=results)
         results.write('\n\n')
         print(results.getvalue())
 
 
-    def _join_game_row_factory(self, cur, row):
-        fields = [column[0] for column in cur.description]
-        as_dict = {key: value for key, value in zip(fields, row)}
-        return JoinGame(**as_dict)
+    def _sync(self):
+        with sync_duration.time(stage='sync'):
+            self.sync_report = {}
+            with sync_duration.time(stage='update_game_states'):
+                live = self.update_game_states()
+
+            for status in ['FINAL', 'IMPORTED']:
+                self.update_games_by_status(status)
+
+        return {'live': live, 'report': self.sync_report}
+
 
-    
-    def _join_player_stats_row_factory(self, cur, row):
-        fields = [column[0] for column in cur.description]
-        as_dict = {key: value for key, value in zip(fields, row)}
-        return JoinPlayerStats(**as_dict)
+    def _connection(self, readonly=False):
+        return get_pool(self.teams.db_dir).connection(readonly=readonly)
 
 
 ###############################################################################
@@ -0,0 +1,195 @@
+from dataclasses import dataclass
+from time import time
+
+from utils.connections import get_pool
+from version import VersionNumber
+
+
+###############################################################################
+
+
+@dataclass(slots=True)
+class Migration:
+    version: VersionNumber
+    name: str
+    statements: list[str]
+
+    @property
+    def version_tuple(self):
+        return tuple(int(part) for part in self.version.as_tuple)
+
+
+# append only, a migration that has shipped must never be edited
+MIGRATIONS = [
+    Migration(
+        VersionNumber(0, 7, 2),
+        'player_stats_player_game_unique',
+        [
+            # rows written before the unique key existed may be duplicated,
+            # keep the most recent line for each player and game
+            '''
+                DELETE FROM player_stats
+                WHERE rowid NOT IN (
+                    SELECT MAX(rowid) FROM player_stats
+                    GROUP BY player_nhlid, game_rowid
+                )
+            ''',
+            '''
+                CREATE UNIQUE INDEX IF NOT EXISTS player_stats_player_game
+                ON player_stats(player_nhlid, game_rowid)
+            '''
+        ]
+    ),
+    Migration(
+        VersionNumber(0, 7, 2),
+        'games_nhlid_unique',
+        [
+            '''
+                DELETE FROM games
+                WHERE rowid NOT IN (
+                    SELECT MIN(rowid) FROM games GROUP BY nhlid
+                )
+            ''',
+            '''
+                CREATE UNIQUE INDEX IF NOT EXISTS games_nhlid
+                ON games(nhlid)
+            '''
+        ]
+    ),
+    Migration(
+        VersionNumber(0, 7, 2),
+        'secondary_indexes',
+        [
+            'CREATE INDEX IF NOT EXISTS games_status ON games(status)',
+            'CREATE INDEX IF NOT EXISTS games_start_time ON games(start_time)',
+            '''
+                CREATE INDEX IF NOT EXISTS games_home_team
+                ON games(home_team_rowid)
+            ''',
+            '''
+                CREATE INDEX IF NOT EXISTS games_away_team
+                ON games(away_team_rowid)
+            ''',
+            '''
+                CREATE INDEX IF NOT EXISTS players_team
+                ON players(team_rowid)
+            ''',
+            '''
+                CREATE INDEX IF NOT EXISTS player_stats_game
+                ON player_stats(game_rowid)
+            '''
+        ]
+    ),
+    Migration(
+        VersionNumber(0, 7, 2),
+        'players_nhlid_unique',
+        [
+            '''
+                DELETE FROM players
+                WHERE rowid NOT IN (
+                    SELECT MAX(rowid) FROM players GROUP BY nhlid
+                )
+            ''',
+            '''
+                CREATE UNIQUE INDEX IF NOT EXISTS players_nhlid
+                ON players(nhlid)
+            '''
+        ]
+    ),
+    Migration(
+        VersionNumber(0, 7, 2),
+        'player_stats_team_indexes',
+        [
+            '''
+                CREATE INDEX IF NOT EXISTS player_stats_team
+                ON player_stats(team_rowid, game_rowid)
+            ''',
+            '''
+                CREATE INDEX IF NOT EXISTS player_stats_opp
+                ON player_stats(opp_rowid, game_rowid)
+            '''
+        ]
+    ),
+]
+
+
+###############################################################################
+
+
+class MigrationRunner:
+    def __init__(self, db_dir: str, migrations: list[Migration] = MIGRATIONS):
+        self.db_dir = db_dir
+        self.migrations = sorted(migrations, key=lambda m: m.version_tuple)
+
+
+    #------------------------------------------------------#
+
+
+    def init_db(self):
+        with get_pool(self.db_dir).connection() as con:
+            cur = con.cursor()
+            sql = '''
+                CREATE TABLE IF NOT EXISTS schema_migrations(
+                    version TEXT NOT NULL,
+                    name TEXT NOT NULL,
+                    applied INTEGER NOT NULL,
+                    PRIMARY KEY(version, name)
+                )
+            '''
+            cur.execute(sql)
+
+
+    def applied(self) -> set[tuple[str, str]]:
+        self.init_db()
+        with get_pool(self.db_dir).connection() as con:
+            cur = con.cursor()
+            sql = 'SELECT version, name FROM schema_migrations'
+            cur.execute(sql)
+            return set(cur.fetchall())
+
+
+    def pending(self, version_number: VersionNumber) -> list[Migration]:
+        # migrations newer than the running code are left for a later install
+        target = tuple(int(part) for part in version_number.as_tuple)
+        applied = self.applied()
+        return [
+            migration for migration in self.migrations
+            if migration.version_tuple <= target
+            and (migration.version.as_str, migration.name) not in applied
+        ]
+
+
+    def run(self, version_number: VersionNumber, results=None):
+        migrations = self.pending(version_number)
+        for migration in migrations:
+            # each migration commits along with its bookkeeping row. sqlite3
+            # only opens its implicit transaction before DML, so without the
+            # explicit BEGIN every CREATE INDEX would commit on its own
+            with get_pool(self.db_dir).connection() as con:
+                cur = con.cursor()
+                if not con.in_transaction:
+                    cur.execute('BEGIN IMMEDIATE')
+                for sql in migration.statements:
+                    cur.execute(sql)
+                sql = 'INSERT INTO schema_migrations VALUES (?, ?, ?)'
+                cur.execute(
+                    sql,
+                    (migration.version.as_str, migration.name, int(time()))
+                )
+
+            if results is not None:
+                results.write(
+                    f'\napplied migration {migration.version.as_str} '
+                    f'{migration.name}'
+                )
+        return migrations
+
+
+    def reset(self):
+        with get_pool(self.db_dir).connection() as con:
+            cur = con.cursor()
+            sql = 'DROP TABLE IF EXISTS schema_migrations'
+            cur.execute(sql)
+
+
+###############################################################################
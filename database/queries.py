@@ -0,0 +1,268 @@
+###############################################################################
+
+
+class JoinQuery:
+    # override in the child class
+    def __init__(self):
+        self._select = ''
+        self._columns = {}
+        self._default_order = []
+        self._where = []
+        self._params = []
+        self._order = []
+        self._limit = None
+        self._offset = None
+
+
+    #------------------------------------------------------#
+
+
+    @property
+    def sql(self) -> str:
+        sql = self._select
+        if self._where:
+            sql += '\tWHERE ' + '\n\t\tAND '.join(self._where)
+        order = self._order or self._default_order
+        if order:
+            sql += '\n\tORDER BY ' + ', '.join(order)
+        if self._limit is not None:
+            sql += '\n\tLIMIT ? OFFSET ?'
+        return sql
+
+
+    @property
+    def params(self) -> tuple:
+        params = list(self._params)
+        if self._limit is not None:
+            params += [self._limit, self._offset or 0]
+        return tuple(params)
+
+
+    #------------------------------------------------------#
+
+
+    def where(self, clause: str, *params):
+        self._where.append(f'({clause})')
+        self._params.extend(params)
+        return self
+
+
+    def order_by(self, column: str, descending=False):
+        # only whitelisted columns reach the sql text
+        try:
+            column = self._columns[column]
+        except KeyError:
+            raise ValueError(f'Invalid order column: {column}')
+        self._order.append(f'{column} {"DESC" if descending else "ASC"}')
+        return self
+
+
+    def limit(self, limit: int, offset: int = 0):
+        self._limit = int(limit)
+        self._offset = int(offset)
+        return self
+
+
+    #::::::::::::::::::::::::::::::::::::::::::::::::::::::#
+
+
+    def _where_in(self, column: str, values):
+        values = list(values)
+        if not values:
+            # an empty filter matches nothing, like an empty IN ()
+            return self.where('0')
+        marks = ', '.join('?' for _ in values)
+        return self.where(f'{column} IN ({marks})', *values)
+
+
+###############################################################################
+
+
+class JoinGamesQuery(JoinQuery):
+    def __init__(self):
+        super().__init__()
+        self._select = '''
+            SELECT
+                g.rowid,
+                g.status,
+                ht.code as ht_code,
+                g.home_team_points as ht_points,
+                at.code as at_code,
+                g.away_team_points as at_points,
+                g.start_time
+            FROM games as g
+            INNER JOIN teams as ht ON g.home_team_rowid = ht.rowid
+            INNER JOIN teams as at ON g.away_team_rowid = at.rowid
+        '''
+        self._columns = {
+            'rowid': 'g.rowid',
+            'status': 'g.status',
+            'start_time': 'g.start_time',
+            'ht_code': 'ht.code',
+            'at_code': 'at.code',
+        }
+        self._default_order = ['g.start_time ASC', 'g.rowid ASC']
+
+
+    #------------------------------------------------------#
+
+
+    def game_rowid(self, rowid: int):
+        return self.where('g.rowid=?', rowid)
+
+
+    def game_rowids(self, rowids: list[int]):
+        return self._where_in('g.rowid', rowids)
+
+
+    def team_rowid(self, rowid: int):
+        return self.where(
+            'g.home_team_rowid=? OR g.away_team_rowid=?',
+            rowid,
+            rowid
+        )
+
+
+    def home_team_rowid(self, rowid: int):
+        return self.where('g.home_team_rowid=?', rowid)
+
+
+    def away_team_rowid(self, rowid: int):
+        return self.where('g.away_team_rowid=?', rowid)
+
+
+    def status(self, statuses: list[str]):
+        return self._where_in('g.status', statuses)
+
+
+    def team_codes(self, codes: list[str]):
+        codes = list(codes)
+        if not codes:
+            return self.where('0')
+        marks = ', '.join('?' for _ in codes)
+        return self.where(
+            f'ht.code IN ({marks}) OR at.code IN ({marks})',
+            *codes,
+            *codes
+        )
+
+
+    def starts_after(self, timestamp: float):
+        return self.where('g.start_time>=?', timestamp)
+
+
+    def starts_before(self, timestamp: float):
+        return self.where('g.start_time<?', timestamp)
+
+
+    def starts_at(self, timestamp: float):
+        return self.where('g.start_time=?', timestamp)
+
+
+###############################################################################
+
+
+class JoinPlayerStatsQuery(JoinQuery):
+    def __init__(self):
+        super().__init__()
+        self._select = '''
+            SELECT
+                g.rowid as game_rowid,
+                g.start_time as game_start_time,
+                p.nhlid as player_nhlid,
+                t.code as team_code,
+                ot.code as opp_code,
+                p.position as player_position,
+                p.name as player_name,
+                s.goals,
+                s.assists,
+                s.hits,
+                s.blocked_shots,
+                s.shots_on_goal
+            FROM player_stats as s
+            INNER JOIN games as g ON s.game_rowid = g.rowid
+            INNER JOIN teams as t ON s.team_rowid = t.rowid
+            INNER JOIN teams as ot ON s.opp_rowid = ot.rowid
+            INNER JOIN players as p ON s.player_nhlid = p.nhlid
+        '''
+        self._columns = {
+            'game_rowid': 'g.rowid',
+            'start_time': 'g.start_time',
+            'player_nhlid': 'p.nhlid',
+            'team_code': 't.code',
+            'opp_code': 'ot.code',
+            'position': 'p.position',
+            'name': 'p.name',
+            'goals': 's.goals',
+            'assists': 's.assists',
+            'hits': 's.hits',
+            'blocked_shots': 's.blocked_shots',
+            'shots_on_goal': 's.shots_on_goal',
+        }
+        self._default_order = ['t.code ASC', 'g.start_time ASC', 's.rowid ASC']
+
+
+    #------------------------------------------------------#
+
+
+    # filters go through player_stats columns so an index picks the rows,
+    # team codes are resolved to rowids first for the team indexes
+    def game_rowid(self, rowid: int):
+        return self.where('s.game_rowid=?', rowid)
+
+
+    def game_rowids(self, rowids: list[int]):
+        return self._where_in('s.game_rowid', rowids)
+
+
+    def player_nhlid(self, nhlid: int):
+        return self.where('s.player_nhlid=?', nhlid)
+
+
+    def player_nhlids(self, nhlids: list[int]):
+        return self._where_in('s.player_nhlid', nhlids)
+
+
+    def team_rowid(self, rowid: int):
+        return self.where('s.team_rowid=?', rowid)
+
+
+    def team_codes(self, codes: list[str]):
+        return self._where_in_codes('s.team_rowid', codes)
+
+
+    def opp_rowid(self, rowid: int):
+        return self.where('s.opp_rowid=?', rowid)
+
+
+    def opp_codes(self, codes: list[str]):
+        return self._where_in_codes('s.opp_rowid', codes)
+
+
+    def positions(self, positions: list[str]):
+        return self._where_in('p.position', positions)
+
+
+    def starts_after(self, timestamp: float):
+        return self.where('g.start_time>=?', timestamp)
+
+
+    def starts_before(self, timestamp: float):
+        return self.where('g.start_time<?', timestamp)
+
+
+    #::::::::::::::::::::::::::::::::::::::::::::::::::::::#
+
+
+    def _where_in_codes(self, column: str, codes):
+        codes = list(codes)
+        if not codes:
+            return self.where('0')
+        marks = ', '.join('?' for _ in codes)
+        return self.where(
+            f'{column} IN (SELECT rowid FROM teams WHERE code IN ({marks}))',
+            *codes
+        )
+
+
+###############################################################################
@@ -0,0 +1,189 @@
+import traceback
+from threading import Thread, Event, Lock
+from time import time
+
+try:
+    import fcntl
+except ImportError:
+    # no flock on windows, every process runs its own scheduler
+    fcntl = None
+
+
+###############################################################################
+
+
+LIVE_INTERVAL = 5
+MAX_IDLE_INTERVAL = 30 * 60
+# how often a process that is not the leader tries to take over
+LEADER_RETRY_INTERVAL = 60
+
+
+###############################################################################
+
+
+class SyncScheduler:
+    # owns Database.sync() on a background thread. While games are LIVE or
+    # FINAL it ticks every live_interval seconds, otherwise it sleeps until
+    # the next scheduled start time (capped at max_idle_interval).
+    # Only one process per database syncs: the one holding the flock on
+    # <db_dir>.scheduler.lock, kept until it stops or exits. The other
+    # gunicorn workers retry every leader_retry_interval and report the
+    # leader's last sync.
+    def __init__(
+        self,
+        db,
+        live_interval: float = LIVE_INTERVAL,
+        max_idle_interval: float = MAX_IDLE_INTERVAL,
+        leader_retry_interval: float = LEADER_RETRY_INTERVAL
+    ):
+        self.db = db
+        self.live_interval = live_interval
+        self.max_idle_interval = max_idle_interval
+        self.leader_retry_interval = leader_retry_interval
+
+        self.leader = False
+        self.live = False
+        self.syncs = 0
+        self.last_sync = None
+        self.last_duration = None
+        self.last_error = None
+        self.next_sync = None
+
+        self._thread = None
+        self._stop = Event()
+        self._wake = Event()
+        self._lock = Lock()
+        self._leader_lock = None
+
+
+    #------------------------------------------------------#
+
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = Thread(
+            target=self._run,
+            name='sync-scheduler',
+            daemon=True
+        )
+        self._thread.start()
+
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+
+    def sync_once(self):
+        with self._lock:
+            start = time()
+            try:
+                self.live = self.db.sync()
+                self.last_error = None
+            except Exception:
+                self.last_error = traceback.format_exc()
+                print(self.last_error)
+            self.last_sync = time()
+            self.last_duration = self.last_sync - start
+            self.syncs += 1
+
+
+    @property
+    def status(self):
+        live, last_sync, report = self.live, self.last_sync, self.db.sync_report
+        if not self.leader:
+            # the last sync of the leader, saved by the sync's single flight
+            saved = self.db.sync_flight.last_result
+            if saved is not None:
+                live = saved['result']['live']
+                last_sync = saved['finished']
+                report = saved['result']['report']
+
+        return {
+            'leader': self.leader,
+            'live': live,
+            'syncs': self.syncs,
+            'last_sync': last_sync,
+            'last_duration': self.last_duration,
+            'next_sync': self.next_sync,
+            'error': self.last_error is not None,
+            'report': report,
+            'coalesced': self.db.sync_flight.stats
+        }
+
+
+    #::::::::::::::::::::::::::::::::::::::::::::::::::::::#
+
+
+    def _run(self):
+        try:
+            while not self._stop.is_set():
+                if not self._lead():
+                    self.next_sync = None
+                    self._wake.wait(self.leader_retry_interval)
+                    self._wake.clear()
+                    continue
+                self._tick()
+        finally:
+            self._resign()
+
+
+    def _tick(self):
+        self.sync_once()
+
+        try:
+            delay = self._next_delay()
+        except Exception:
+            print(traceback.format_exc())
+            delay = self.live_interval
+        self.next_sync = time() + delay
+        self._wake.wait(delay)
+        self._wake.clear()
+
+
+    def _next_delay(self) -> float:
+        games = self.db.games
+        if self.live or games.read_by_status('FINAL') != []:
+            return self.live_interval
+
+        next_start = games.read_next_start_time('FUT')
+        if next_start is None:
+            return self.max_idle_interval
+
+        delay = next_start - time()
+        return min(max(delay, self.live_interval), self.max_idle_interval)
+
+
+    def _lead(self) -> bool:
+        if self.leader:
+            return True
+        if fcntl is None:
+            self.leader = True
+            return True
+
+        lock = open(f'{self.db.games.db_dir}.scheduler.lock', 'a')
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            # another process is the leader
+            lock.close()
+            return False
+        self._leader_lock = lock
+        self.leader = True
+        return True
+
+
+    def _resign(self):
+        # closing the file releases the flock for the next leader
+        if self._leader_lock is not None:
+            self._leader_lock.close()
+            self._leader_lock = None
+        self.leader = False
+
+
+###############################################################################
@@ -1,17 +1,29 @@
 import sqlite3
+from collections import deque
+from heapq import heapify, heappop, heappush
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from io import StringIO
 from datetime import datetime
+from threading import Lock
 from time import sleep
 
 from utils.classes import SQLiteTable
+from utils.connections import get_pool
 from utils.dataclasses import Game, Player
+from utils.metrics import sync_duration
 
 
 ###############################################################################
 
 
 CURRENT_SEASON="20242025"
+BOXSCORE_WORKERS = 8
+SCHEDULE_WORKERS = 32
+GAMES_PER_TRANSACTION = 1
+# bound parameters per statement, below every sqlite build's limit
+MAX_VARIABLES = 900
 banned_codes = ['MUN']
 
 
@@ -63,12 +75,35 @@ test_data = [
 
 
 class GamesTable(SQLiteTable):
-    def __init__(self, testing=False):
+    def __init__(
+        self,
+        testing=False,
+        boxscore_workers=BOXSCORE_WORKERS,
+        schedule_workers=SCHEDULE_WORKERS,
+        games_per_transaction=GAMES_PER_TRANSACTION
+    ):
         if not testing:
             self.db_dir = str(Path('database', 'data.db'))
         else:
             self.db_dir = str(Path('database', 'test.db'))
         self.dataclass = Game
+        # number of boxscores fetched from the NHL api at the same time
+        self.boxscore_workers = boxscore_workers
+        # number of team schedules fetched at the same time
+        self.schedule_workers = schedule_workers
+        # compiled games committed together, more games per transaction
+        # means fewer commits but more work redone after a crash
+        self.games_per_transaction = games_per_transaction
+
+        # what was last written for each game and skater line, so polls of
+        # an unchanged boxscore skip their writes
+        self._fingerprints = {}
+        self._skater_fingerprints = {}
+
+        # min-heap of (start_time, rowid) for FUT games, loaded on first use
+        # so checking for started games only touches the ones that are due
+        self._start_times = None
+        self._start_times_lock = Lock()
 
         self._table_name = 'games'
         self._group_keys = {
@@ -84,7 +119,7 @@ class GamesTable(SQLiteTable):
     #------------------------------------------------------# 
 
     def init_db(self):
-        with sqlite3.connect(self.db_dir) as con:
+        with self._connection() as con:
             cur = con.cursor()
             sql = '''
                 CREATE TABLE games(
@@ -122,7 +157,7 @@ class GamesTable(SQLiteTable):
 
 
     def add(self, game: Game) -> int:
-        with sqlite3.connect(self.db_dir) as con:
+        with self._connection() as con:
             cur = con.cursor()
             sql = '''
                 INSERT INTO games(
@@ -147,14 +182,63 @@ class GamesTable(SQLiteTable):
                 )
             '''
             cur.execute(sql, game.as_dict)
-            return cur.lastrowid
+            rowid = cur.lastrowid
+
+        if game.status == 'FUT':
+            get_pool(self.db_dir).on_commit(
+                lambda: self._push_start_time(game.start_time, rowid)
+            )
+        return rowid
+
+
+    def upsert_many(self, games: list[Game]):
+        # new games are inserted. Known games only take the scheduled status
+        # and start time while still FUT: a schedule that is older than the
+        # database (the NHL cache keeps it for hours) must never move a game
+        # back, the boxscore compiles move it forward from LIVE on
+        with self._connection() as con:
+            cur = con.cursor()
+            sql = '''
+                INSERT INTO games(
+                    timestamp,
+                    nhlid,
+                    start_time,
+                    status,
+                    home_team_rowid,
+                    away_team_rowid,
+                    home_team_points,
+                    away_team_points
+                )
+                VALUES (
+                    :timestamp,
+                    :nhlid,
+                    :start_time,
+                    :status,
+                    :home_team_rowid,
+                    :away_team_rowid,
+                    :home_team_points,
+                    :away_team_points
+                )
+                ON CONFLICT(nhlid) DO UPDATE
+                SET
+                    status=excluded.status,
+                    start_time=excluded.start_time
+                WHERE games.status = 'FUT' AND (
+                    excluded.status != 'FUT'
+                    OR excluded.start_time != games.start_time
+                )
+            '''
+            cur.executemany(sql, [game.as_dict for game in games])
+
+        # imported schedules can add, reschedule and start FUT games
+        get_pool(self.db_dir).on_commit(self.reload_start_times)
 
 
     #------------------------------------------------------# 
 
 
     def read_all(self) -> list[Game]:
-        with sqlite3.connect(self.db_dir) as con:
+        with self._connection(readonly=True) as con:
             cur = con.cursor()
             cur.row_factory = self._dataclass_row_factory
             sql = 'SELECT * FROM games'
@@ -163,7 +247,7 @@ class GamesTable(SQLiteTable):
 
 
     def read_by_rowid(self, rowid: int) -> Game:
-        with sqlite3.connect(self.db_dir) as con:
+        with self._connection(readonly=True) as con:
             cur = con.cursor()
             cur.row_factory = self._dataclass_row_factory
             sql = 'SELECT * FROM games WHERE rowid=?'
@@ -172,7 +256,7 @@ class GamesTable(SQLiteTable):
 
 
     def read_by_status(self, status: str) -> list[Game]:
-        with sqlite3.connect(self.db_dir) as con:
+        with self._connection(readonly=True) as con:
             cur = con.cursor()
             cur.row_factory = self._dataclass_row_factory
             sql = 'SELECT * FROM games WHERE status=?'
@@ -181,16 +265,35 @@ class GamesTable(SQLiteTable):
 
 
     def read_by_start_time(self, start_time: int) -> list[Game]:
-        with sqlite3.connect(self.db_dir) as con:
+        with self._connection(readonly=True) as con:
             cur = con.cursor()
             cur.row_factory = self._dataclass_row_factory
             sql = 'SELECT * FROM games WHERE start_time=?'
             cur.execute(sql, (start_time,))
             return cur.fetchall()
+
+
+    def read_next_start_time(
+        self,
+        status: str = 'FUT',
+        after: float | None = None
+    ) -> int | None:
+        with self._connection(readonly=True) as con:
+            cur = con.cursor()
+            if after is None:
+                sql = 'SELECT MIN(start_time) FROM games WHERE status=?'
+                cur.execute(sql, (status,))
+            else:
+                sql = '''
+                    SELECT MIN(start_time) FROM games
+                    WHERE status=? AND start_time>?
+                '''
+                cur.execute(sql, (status, after))
+            return cur.fetchone()[0]
     
 
     def read_by_team_rowid(self, rowid: int) -> list[Game]:
-        with sqlite3.connect(self.db_dir) as con:
+        with self._connection(readonly=True) as con:
             cur = con.cursor()
             cur.row_factory = self._dataclass_row_factory
             sql = f'''
@@ -203,7 +306,7 @@ class GamesTable(SQLiteTable):
 
 
     def read_by_nhlid(self, nhlid: int) -> Game:
-        with sqlite3.connect(self.db_dir) as con:
+        with self._connection(readonly=True) as con:
             cur = con.cursor()
             cur.row_factory = self._dataclass_row_factory
             sql = 'SELECT * FROM games WHERE nhlid=?'
@@ -221,45 +324,113 @@ class GamesTable(SQLiteTable):
                 'home_team_points':  boxscore['homeTeam']['score'],
                 'away_team_points': boxscore['awayTeam']['score']
             }
-            with sqlite3.connect(self.db_dir) as con:
+            with self._connection() as con:
                 cur = con.cursor()
+                # unchanged scores are not rewritten
                 sql = '''
                     UPDATE games
                     SET
                         home_team_points=:home_team_points,
                         away_team_points=:away_team_points
                     WHERE rowid=:rowid
+                    AND (
+                        home_team_points IS NOT :home_team_points
+                        OR away_team_points IS NOT :away_team_points
+                    )
                 '''
                 cur.execute(sql, s)
-                con.commit()
 
 
     def update_status(self, game: Game):
-        with sqlite3.connect(self.db_dir) as con:
+        with self._connection() as con:
             cur = con.cursor()
             sql = '''
                 UPDATE games
                 SET
                     status=?
-                WHERE rowid=?
+                WHERE rowid=? AND status IS NOT ?
             '''
-            cur.execute(sql, (game.status, game.rowid))
-            con.commit()
-        
+            cur.execute(sql, (game.status, game.rowid, game.status))
+
+
+    def start_due_games(self, now: float) -> list[int]:
+        # FUT games that have started go LIVE in one update. Only the heap
+        # entries that are due get popped, entries for games that were
+        # rescheduled or moved on since are filtered out by the status check
+        with self._start_times_lock:
+            if self._start_times is None:
+                self._start_times = self._load_start_times()
+            due = []
+            while self._start_times and self._start_times[0][0] <= now:
+                due.append(heappop(self._start_times)[1])
+
+        if not due:
+            return []
+
+        started = []
+        try:
+            with self._connection() as con:
+                cur = con.cursor()
+                for i in range(0, len(due), MAX_VARIABLES):
+                    chunk = due[i:i + MAX_VARIABLES]
+                    marks = ', '.join('?' * len(chunk))
+                    sql = f'''
+                        UPDATE games
+                        SET
+                            status='LIVE'
+                        WHERE status='FUT' AND rowid IN ({marks})
+                        RETURNING rowid
+                    '''
+                    cur.execute(sql, chunk)
+                    started += [row[0] for row in cur.fetchall()]
+        except Exception:
+            # the popped games were not started, load them again next time
+            self.reload_start_times()
+            raise
+        return started
+
+
+    #------------------------------------------------------# 
+
+
+    def reload_start_times(self):
+        # rebuilt from the database the next time start_due_games() runs
+        with self._start_times_lock:
+            self._start_times = None
+
+
+    def _load_start_times(self) -> list[tuple[float, int]]:
+        with self._connection(readonly=True) as con:
+            cur = con.cursor()
+            sql = "SELECT start_time, rowid FROM games WHERE status='FUT'"
+            cur.execute(sql)
+            start_times = cur.fetchall()
+        heapify(start_times)
+        return start_times
+
+
+    def _push_start_time(self, start_time, rowid):
+        with self._start_times_lock:
+            if self._start_times is not None:
+                heappush(self._start_times, (start_time, rowid))
+
 
 ###############################################################################
 
 
     def _update_games(self, nhl, teams):
-        for team in teams.read_all():
-            schedule = nhl.schedule.get_season_schedule(
-                team_abbr=team.code,
-                season=CURRENT_SEASON
-            )
+        all_teams = teams.read_all()
+        teams_by_code = {team.code: team for team in all_teams}
+
+        # every game shows up in both teams' schedules, keep the first copy
+        games = {}
+        for team, schedule in self._fetch_schedules(nhl, all_teams):
             for game in schedule['games']:
                 # print(*game.items(), sep='\n')
                 if game['gameType'] == 1:
                     continue
+                if game['id'] in games:
+                    continue
 
                 timestamp = datetime.now().timestamp()
                 start_time = datetime.strptime(
@@ -275,11 +446,12 @@ class GamesTable(SQLiteTable):
                     continue
                 if game['homeTeam']['abbrev'] in banned_codes:
                     continue
-                away_team = teams.read_by_code(game['awayTeam']['abbrev'])
-                home_team = teams.read_by_code(game['homeTeam']['abbrev'])
+                away_team = teams_by_code.get(game['awayTeam']['abbrev'])
+                home_team = teams_by_code.get(game['homeTeam']['abbrev'])
 
                 if away_team is None or home_team is None:
                     print(game)
+                    continue
 
                 game_data = [
                     timestamp,
@@ -289,24 +461,22 @@ class GamesTable(SQLiteTable):
                     home_team.rowid,
                     away_team.rowid,
                 ]
-                game_obj = Game(*game_data)
-
-                res = self.read_by_nhlid(game_obj.nhlid)
-                if res is not None:
-                    if res.status == 'COMPILED':
-                        continue
-
-                    game_obj.rowid = res.rowid
-                    self.update_status(game_obj)
-                    continue
-
-                self.add(game_obj)
+                games[game['id']] = Game(*game_data)
 
             else:
                 print(f'-- Imported {CURRENT_SEASON} {team.name} games')
 
+        self.upsert_many(list(games.values()))
+
 
     def _compile_games_by_status(self, query_status, nhl, teams, player_stats, players):
+        report = {
+            'games_written': 0,
+            'games_skipped': 0,
+            'skaters_written': 0,
+            'skaters_skipped': 0
+        }
+
         all_games = self.read_all()
         games = [
             game for game in all_games
@@ -314,64 +484,221 @@ class GamesTable(SQLiteTable):
         ]
         if games == []:
             print(f'No {query_status} Games to Update')
-            return
+            return report
+
+        # boxscores are fetched concurrently, every write stays on this
+        # thread. All the writes for a game commit together, so a crash
+        # never leaves it half compiled.
+        boxscores = enumerate(self._fetch_boxscores(nhl, games))
+        batch_size = max(1, self.games_per_transaction)
+        while True:
+            with sync_duration.time(stage='boxscore_wait'):
+                batch = list(islice(boxscores, batch_size))
+            if not batch:
+                break
+
+            with sync_duration.time(stage='game_write'), self._connection():
+                for i, (game, boxscore) in batch:
+                    print(f'{query_status} {i + 1}/{len(games)}/{len(all_games)}')
+                    self._compile_game(
+                        query_status,
+                        game,
+                        boxscore,
+                        nhl,
+                        teams,
+                        player_stats,
+                        players,
+                        report
+                    )
+
+        print(
+            f'{query_status}: wrote {report["games_written"]} games, '
+            f'skipped {report["games_skipped"]}; '
+            f'wrote {report["skaters_written"]} skater lines, '
+            f'skipped {report["skaters_skipped"]}'
+        )
+        return report
+
+
+    def _compile_game(
+        self,
+        query_status,
+        game,
+        boxscore,
+        nhl,
+        teams,
+        player_stats,
+        players,
+        report
+    ):
+        home_team = teams.read_by_rowid(game.home_team_rowid)
+        away_team = teams.read_by_rowid(game.away_team_rowid)
+
+        skater_lines = self._skater_lines(boxscore, teams)
+        skater_fingerprints = {
+            line[1]['playerId']: self._skater_fingerprint(line)
+            for line in skater_lines
+        }
+        # only the fields that get written go into the fingerprint, the
+        # clock and play data change on every poll of a live game
+        fingerprint = (
+            boxscore['gameState'],
+            boxscore['homeTeam'].get('score'),
+            boxscore['awayTeam'].get('score'),
+            tuple(skater_fingerprints.values())
+        )
 
-        for i, game in enumerate(games):
-            home_team = teams.read_by_rowid(game.home_team_rowid)
-            away_team = teams.read_by_rowid(game.away_team_rowid)
+        status = boxscore['gameState']
+        if status == 'CRIT':
+            status = 'LIVE'
+        if status == 'OFF':
+            status = 'IMPORTED'
 
-            print(f'{query_status} {i + 1}/{len(games)}/{len(all_games)}')
-            boxscore = nhl.game_center.boxscore(game.nhlid)
-            status = boxscore['gameState']
+        unchanged = (
+            self._fingerprints.get(game.rowid) == fingerprint
+            and game.status == status
+        )
+        if unchanged:
+            report['games_skipped'] += 1
+            report['skaters_skipped'] += len(skater_lines)
+        else:
+            report['games_written'] += 1
             self.update_score(game, nhl, boxscore)
 
             game.status = status
-
-            if game.status == 'CRIT':
-                game.status = 'LIVE'
-
-            if game.status == 'OFF':
-                game.status = 'IMPORTED'
-
             self.update_status(game)
 
             game = self.read_by_rowid(game.rowid)
             print(f'\t{away_team.code} ({game.away_team_points}) @ {home_team.code} ({game.home_team_points})')
 
-            try:
-                stats = boxscore['playerByGameStats']
-            except KeyError:
-                stats = {}
-
-            for team, roster in stats.items():
-                if team == 'awayTeam':
-                    opp_team = boxscore['homeTeam']['abbrev']
-                else:
-                    opp_team = boxscore['awayTeam']['abbrev']
-                opp_team = teams.read_by_code(opp_team)
-                db_team = teams.read_by_code(boxscore[team]['abbrev'])
-                for position, skater_list in roster.items():
-                    if position == 'goalies':
-                        continue
-
-                    for skater in skater_list:
-                        player_stats.update_by_game(
-                            boxscore,
-                            skater,
-                            db_team.rowid,
-                            opp_team.rowid,
-                            game.rowid
-                        )
-                        players.update_by_game(game, skater, team)
-
-            match query_status:
-                case 'IMPORTED':
-                    game.status = 'COMPILED'
-                    self.update_status(game)
-                case 'LIVE' | 'FINAL':
-                    pass
-                case _:
-                    raise NotImplementedError
+            written = self._skater_fingerprints.get(game.rowid, {})
+            changed_lines = [
+                line for line in skater_lines
+                if written.get(line[1]['playerId'])
+                != skater_fingerprints[line[1]['playerId']]
+            ]
+            report['skaters_written'] += len(changed_lines)
+            report['skaters_skipped'] += (
+                len(skater_lines) - len(changed_lines)
+            )
+
+            for team, skater, team_rowid, opp_rowid in changed_lines:
+                players.update_by_game(game, skater, team)
+
+            if changed_lines:
+                player_stats.update_many_by_game(
+                    game.rowid,
+                    [line[1:] for line in changed_lines]
+                )
+
+            self._remember(game.rowid, fingerprint, skater_fingerprints)
+
+        match query_status:
+            case 'IMPORTED':
+                game.status = 'COMPILED'
+                self.update_status(game)
+                # compiled games are never fetched again
+                self._forget(game.rowid)
+            case 'LIVE' | 'FINAL':
+                pass
+            case _:
+                raise NotImplementedError
+
+
+    def _skater_lines(self, boxscore, teams):
+        # [(team, skater, team_rowid, opp_rowid), ...] without goalies
+        try:
+            stats = boxscore['playerByGameStats']
+        except KeyError:
+            stats = {}
+
+        skater_lines = []
+        for team, roster in stats.items():
+            if team == 'awayTeam':
+                opp_team = boxscore['homeTeam']['abbrev']
+            else:
+                opp_team = boxscore['awayTeam']['abbrev']
+            opp_team = teams.read_by_code(opp_team)
+            db_team = teams.read_by_code(boxscore[team]['abbrev'])
+            for position, skater_list in roster.items():
+                if position == 'goalies':
+                    continue
+
+                for skater in skater_list:
+                    skater_lines.append(
+                        (team, skater, db_team.rowid, opp_team.rowid)
+                    )
+        return skater_lines
+
+
+    @staticmethod
+    def _skater_fingerprint(line):
+        team, skater, team_rowid, opp_rowid = line
+        return (
+            team,
+            team_rowid,
+            opp_rowid,
+            skater['playerId'],
+            skater['name']['default'],
+            skater['position'],
+            skater['goals'],
+            skater['assists'],
+            skater['hits'],
+            skater['blockedShots'],
+            skater['sog']
+        )
+
+
+    def _remember(self, game_rowid, fingerprint, skater_fingerprints):
+        # recorded only once the writes have committed, a rolled back game
+        # is written again on the next pass
+
+        def remember():
+            self._fingerprints[game_rowid] = fingerprint
+            self._skater_fingerprints[game_rowid] = skater_fingerprints
+
+        get_pool(self.db_dir).on_commit(remember)
+
+
+    def _forget(self, game_rowid):
+
+        def forget():
+            self._fingerprints.pop(game_rowid, None)
+            self._skater_fingerprints.pop(game_rowid, None)
+
+        get_pool(self.db_dir).on_commit(forget)
+
+
+    def _fetch_schedules(self, nhl, teams):
+        # yields (team, schedule) in the order of teams
+        workers = max(1, self.schedule_workers)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            schedules = executor.map(
+                lambda team: nhl.schedule.get_season_schedule(
+                    team_abbr=team.code,
+                    season=CURRENT_SEASON
+                ),
+                teams
+            )
+            yield from zip(teams, schedules)
+
+
+    def _fetch_boxscores(self, nhl, games):
+        # yields (game, boxscore) in the order of games, keeping at most
+        # two requests per worker in flight ahead of the consumer
+        workers = max(1, self.boxscore_workers)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            pending = deque()
+            for game in games:
+                future = executor.submit(nhl.game_center.boxscore, game.nhlid)
+                pending.append((game, future))
+                if len(pending) >= workers * 2:
+                    game, future = pending.popleft()
+                    yield game, future.result()
+
+            while pending:
+                game, future = pending.popleft()
+                yield game, future.result()
 
 
 ###############################################################################
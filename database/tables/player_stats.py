@@ -79,7 +79,7 @@ class PlayerStatsTable(SQLiteTable):
 
 
     def init_db(self):
-        with sqlite3.connect(self.db_dir) as con:
+        with self._connection() as con:
             cur = con.cursor()
             sql = '''
                 CREATE TABLE player_stats(
@@ -107,34 +107,30 @@ class PlayerStatsTable(SQLiteTable):
             cur.execute(sql)
 
 
-    def update_by_game(self, boxscore, skater, team_rowid, opp_rowid, game_rowid):
-        player_stat_data = [
-            game_rowid,
-            skater['playerId'],
-            team_rowid,
-            opp_rowid,
-            skater['goals'],
-            skater['assists'],
-            skater['hits'],
-            skater['blockedShots'],
-            skater['sog']
+    def update_many_by_game(self, game_rowid, skater_lines):
+        # skater_lines: [(skater, team_rowid, opp_rowid), ...] for one boxscore
+        player_stats = [
+            PlayerStat(
+                game_rowid,
+                skater['playerId'],
+                team_rowid,
+                opp_rowid,
+                skater['goals'],
+                skater['assists'],
+                skater['hits'],
+                skater['blockedShots'],
+                skater['sog']
+            )
+            for skater, team_rowid, opp_rowid in skater_lines
         ]
-        res = self.read_by_player_and_game_rowids(
-            skater['playerId'],
-            game_rowid
-        )
-        if res is not None:
-            player_stat_data.append(res.rowid)
-            self.update(PlayerStat(*player_stat_data))
-        else:
-            self.add(PlayerStat(*player_stat_data))
+        self.upsert_many(player_stats)
 
 
     #------------------------------------------------------# 
 
 
     def add(self, player_stat: PlayerStat) -> int:
-        with sqlite3.connect(self.db_dir) as con:
+        with self._connection() as con:
             cur = con.cursor()
             sql = '''
                 INSERT INTO player_stats(
@@ -168,7 +164,7 @@ class PlayerStatsTable(SQLiteTable):
 
 
     def read_all(self) -> list[PlayerStat]:
-        with sqlite3.connect(self.db_dir) as con:
+        with self._connection(readonly=True) as con:
             cur = con.cursor()
             cur.row_factory = self._dataclass_row_factory
             sql = 'SELECT * FROM player_stats'
@@ -177,7 +173,7 @@ class PlayerStatsTable(SQLiteTable):
 
     
     def read_by_rowid(self, rowid: int) -> PlayerStat:
-        with sqlite3.connect(self.db_dir) as con:
+        with self._connection(readonly=True) as con:
             cur = con.cursor()
             cur.row_factory = self._dataclass_row_factory
             sql = 'SELECT * FROM player_stats WHERE rowid=?'
@@ -186,7 +182,7 @@ class PlayerStatsTable(SQLiteTable):
 
 
     def read_by_game_rowid(self, game_rowid: int) -> list[PlayerStat]:
-        with sqlite3.connect(self.db_dir) as con:
+        with self._connection(readonly=True) as con:
             cur = con.cursor()
             cur.row_factory = self._dataclass_row_factory
             sql = 'SELECT * FROM player_stats WHERE game_rowid=?'
@@ -195,7 +191,7 @@ class PlayerStatsTable(SQLiteTable):
 
 
     def read_by_player_rowid(self, player_rowid: int) -> list[PlayerStat]:
-        with sqlite3.connect(self.db_dir) as con:
+        with self._connection(readonly=True) as con:
             cur = con.cursor()
             cur.row_factory = self._dataclass_row_factory
             sql = 'SELECT * FROM player_stats WHERE player_nhlid=?'
@@ -208,7 +204,7 @@ class PlayerStatsTable(SQLiteTable):
         player_rowid: int,
         game_rowid: int
     ) -> PlayerStat:
-        with sqlite3.connect(self.db_dir) as con:
+        with self._connection(readonly=True) as con:
             cur = con.cursor()
             cur.row_factory = self._dataclass_row_factory
             sql = 'SELECT * FROM player_stats WHERE player_nhlid=? AND game_rowid=?'
@@ -220,7 +216,7 @@ class PlayerStatsTable(SQLiteTable):
 
 
     def update(self, player_stat: PlayerStat):
-        with sqlite3.connect(self.db_dir) as con:
+        with self._connection() as con:
             cur = con.cursor()
             sql = '''
                 UPDATE player_stats
@@ -233,7 +229,46 @@ class PlayerStatsTable(SQLiteTable):
                 WHERE rowid=:rowid
             '''
             cur.execute(sql, player_stat.as_dict)
-            con.commit()
+
+
+    def upsert_many(self, player_stats: list[PlayerStat]):
+        with self._connection() as con:
+            cur = con.cursor()
+            sql = '''
+                INSERT INTO player_stats(
+                    game_rowid,
+                    player_nhlid,
+                    team_rowid,
+                    opp_rowid,
+                    goals,
+                    assists,
+                    hits,
+                    blocked_shots,
+                    shots_on_goal
+                )
+                VALUES (
+                    :game_rowid,
+                    :player_nhlid,
+                    :team_rowid,
+                    :opp_rowid,
+                    :goals,
+                    :assists,
+                    :hits,
+                    :blocked_shots,
+                    :shots_on_goal
+                )
+                ON CONFLICT(player_nhlid, game_rowid) DO UPDATE
+                SET
+                    goals=excluded.goals,
+                    assists=excluded.assists,
+                    hits=excluded.hits,
+                    blocked_shots=excluded.blocked_shots,
+                    shots_on_goal=excluded.shots_on_goal
+            '''
+            cur.executemany(
+                sql,
+                [player_stat.as_dict for player_stat in player_stats]
+            )
 
 
 
@@ -71,7 +71,7 @@ class PlayersTable(SQLiteTable):
 
 
     def init_db(self):
-        with sqlite3.connect(self.db_dir) as con:
+        with self._connection() as con:
             self._table_name = 'players'
 
             cur = con.cursor()
@@ -94,7 +94,7 @@ class PlayersTable(SQLiteTable):
 
 
     def add(self, player: Player) -> int:
-        with sqlite3.connect(self.db_dir) as con:
+        with self._connection() as con:
             cur = con.cursor()
             sql = '''
                 INSERT INTO players(
@@ -136,7 +136,7 @@ class PlayersTable(SQLiteTable):
 
 
     def read_all(self) -> list[Player]:
-        with sqlite3.connect(self.db_dir) as con:
+        with self._connection(readonly=True) as con:
             cur = con.cursor()
             cur.row_factory = self._dataclass_row_factory
             sql = 'SELECT * FROM players'
@@ -145,7 +145,7 @@ class PlayersTable(SQLiteTable):
 
     
     def read_by_rowid(self, rowid: int) -> Player:
-        with sqlite3.connect(self.db_dir) as con:
+        with self._connection(readonly=True) as con:
             cur = con.cursor()
             cur.row_factory = self._dataclass_row_factory
             sql = 'SELECT * FROM players WHERE rowid=?'
@@ -154,7 +154,7 @@ class PlayersTable(SQLiteTable):
 
 
     def read_by_team_rowid(self, team_rowid: int) -> list[Player]:
-        with sqlite3.connect(self.db_dir) as con:
+        with self._connection(readonly=True) as con:
             cur = con.cursor()
             cur.row_factory = self._dataclass_row_factory
             sql = 'SELECT * FROM players WHERE team_rowid=?'
@@ -163,7 +163,7 @@ class PlayersTable(SQLiteTable):
 
 
     def read_by_name(self, name: str) -> list[Player]:
-        with sqlite3.connect(self.db_dir) as con:
+        with self._connection(readonly=True) as con:
             cur = con.cursor()
             cur.row_factory = self._dataclass_row_factory
             sql = 'SELECT * FROM players WHERE name=?'
@@ -172,7 +172,7 @@ class PlayersTable(SQLiteTable):
 
 
     def read_by_position(self, position: str) -> list[Player]:
-        with sqlite3.connect(self.db_dir) as con:
+        with self._connection(readonly=True) as con:
             cur = con.cursor()
             cur.row_factory = self._dataclass_row_factory
             sql = 'SELECT * FROM players WHERE position=?'
@@ -181,7 +181,7 @@ class PlayersTable(SQLiteTable):
 
 
     def read_by_nhlid(self, nhlid: int) -> Player:
-        with sqlite3.connect(self.db_dir) as con:
+        with self._connection(readonly=True) as con:
             cur = con.cursor()
             cur.row_factory = self._dataclass_row_factory
             sql = 'SELECT * FROM players WHERE nhlid=?'
@@ -193,7 +193,7 @@ class PlayersTable(SQLiteTable):
 
 
     def update(self, player):
-        with sqlite3.connect(self.db_dir) as con:
+        with self._connection() as con:
             cur = con.cursor()
             sql = '''
                 UPDATE players
@@ -204,7 +204,6 @@ class PlayersTable(SQLiteTable):
                 WHERE rowid=:rowid
             '''
             cur.execute(sql, player.as_dict)
-            con.commit()
             
 
 
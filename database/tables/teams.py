@@ -64,12 +64,18 @@ class TeamsTable(SQLiteTable):
         }
         self._test_data = test_data
 
+        # teams almost never change, so lookups by code, rowid and nhlid
+        # are served from memory and the cache is rebuilt after writes
+        self._cache = None
+        self.cache_hits = 0
+        self.cache_misses = 0
+
 
     #------------------------------------------------------# 
 
 
     def init_db(self):
-        with sqlite3.connect(self.db_dir) as con:
+        with self._connection() as con:
             cur = con.cursor()
             sql = '''
                 CREATE TABLE teams(
@@ -97,13 +103,14 @@ class TeamsTable(SQLiteTable):
             if self.read_by_nhlid(team_obj.nhlid) is not None:
                 continue
             self.add(team_obj)
+        self.invalidate_cache()
 
 
     #------------------------------------------------------# 
 
 
     def add(self, team: Team) -> int:
-        with sqlite3.connect(self.db_dir) as con:
+        with self._connection() as con:
             cur = con.cursor()
             sql = '''
                 INSERT INTO teams(
@@ -122,14 +129,16 @@ class TeamsTable(SQLiteTable):
                 )
             '''
             cur.execute(sql, team.as_dict)
-            return cur.lastrowid
+            rowid = cur.lastrowid
+        self.invalidate_cache()
+        return rowid
 
 
     #------------------------------------------------------# 
 
 
     def read_all(self) -> list[Team]:
-        with sqlite3.connect(self.db_dir) as con:
+        with self._connection(readonly=True) as con:
             cur = con.cursor()
             cur.row_factory = self._dataclass_row_factory
             sql = 'SELECT * FROM teams'
@@ -138,16 +147,11 @@ class TeamsTable(SQLiteTable):
 
 
     def read_by_rowid(self, rowid: int) -> Team:
-        with sqlite3.connect(self.db_dir) as con:
-            cur = con.cursor()
-            cur.row_factory = self._dataclass_row_factory
-            sql = 'SELECT * FROM teams WHERE rowid=?'
-            cur.execute(sql, (rowid,))
-            return cur.fetchone()
+        return self._read_cached('rowid', rowid)
 
 
     def read_by_conference(self, conference: str) -> list[Team]:
-        with sqlite3.connect(self.db_dir) as con:
+        with self._connection(readonly=True) as con:
             cur = con.cursor()
             cur.row_factory = self._dataclass_row_factory
             sql = 'SELECT * FROM teams WHERE conference=?'
@@ -156,7 +160,7 @@ class TeamsTable(SQLiteTable):
 
 
     def read_by_division(self, division: str) -> list[Team]:
-        with sqlite3.connect(self.db_dir) as con:
+        with self._connection(readonly=True) as con:
             cur = con.cursor()
             cur.row_factory = self._dataclass_row_factory
             sql = 'SELECT * FROM teams WHERE division=?'
@@ -165,7 +169,7 @@ class TeamsTable(SQLiteTable):
  
 
     def read_by_name(self, name: str) -> Team:
-        with sqlite3.connect(self.db_dir) as con:
+        with self._connection(readonly=True) as con:
             cur = con.cursor()
             cur.row_factory = self._dataclass_row_factory
             sql = 'SELECT * FROM teams WHERE name =?'
@@ -174,21 +178,54 @@ class TeamsTable(SQLiteTable):
 
 
     def read_by_code(self, team_code: str) -> Team:
-        with sqlite3.connect(self.db_dir) as con:
-            cur = con.cursor()
-            cur.row_factory = self._dataclass_row_factory
-            sql = 'SELECT * FROM teams WHERE code=?'
-            cur.execute(sql, (team_code,))
-            return cur.fetchone()
+        return self._read_cached('code', team_code)
 
 
     def read_by_nhlid(self, nhlid: int) -> Team:
-        with sqlite3.connect(self.db_dir) as con:
-            cur = con.cursor()
-            cur.row_factory = self._dataclass_row_factory
-            sql = 'SELECT * FROM teams WHERE nhlid=?'
-            cur.execute(sql, (nhlid,))
-            return cur.fetchone()
+        return self._read_cached('nhlid', nhlid)
+
+
+    #------------------------------------------------------# 
+
+
+    def invalidate_cache(self):
+        self._cache = None
+
+
+    @property
+    def cache_info(self):
+        return {
+            'hits': self.cache_hits,
+            'misses': self.cache_misses,
+            'entries': 0 if self._cache is None else len(self._cache['rowid'])
+        }
+
+
+    #::::::::::::::::::::::::::::::::::::::::::::::::::::::# 
+
+
+    def _read_cached(self, key, value) -> Team:
+        cache = self._cache
+        if cache is not None and value in cache[key]:
+            self.cache_hits += 1
+            return cache[key][value]
+
+        # a miss reloads the whole table, which also picks up teams
+        # added by another process
+        self.cache_misses += 1
+        cache = self._load_cache()
+        return cache[key].get(value)
+
+
+    def _load_cache(self):
+        teams = self.read_all()
+        cache = {
+            'rowid': {team.rowid: team for team in teams},
+            'code': {team.code: team for team in teams},
+            'nhlid': {team.nhlid: team for team in teams}
+        }
+        self._cache = cache
+        return cache
 
 
 ###############################################################################
@@ -1,47 +1,148 @@
+import os
+from pathlib import Path
+
 from nhlpy import NHLClient
 
 from flask import Flask
+from jinja2 import FileSystemBytecodeCache
 
 from version import get_version_number, update_install_version
 from database import Database
-from views import Public, API
-
-
-
-
-update_install_version()
-version = get_version_number()
-
-nhl = NHLClient()
-db = Database(version, nhl, testing=False)
-
-app = Flask(__name__)
-app.config['DEBUG'] = True
-
-app.jinja_options = {"trim_blocks": True, "cache_size": 0}
-app.create_jinja_environment()
-
-public = Public(app, db)
-api = API(app, db)
-
-app.add_url_rule(
-    "/",
-    view_func=public.home
-)
-app.add_url_rule(
-    "/database/games",
-    view_func=api.games
-)
-app.add_url_rule(
-    "/api/sync",
-    view_func=api.sync
-)
-app.add_url_rule(
-    "/database/stats",
-    view_func=api.stats
-)
-app.add_url_rule(
-    "/info/upcoming_games",
-    view_func=api.upcoming_games
-)
+from database.scheduler import SyncScheduler
+from views import Public, API, Metrics
+from utils.lazy import Lazy
+from utils.nhl_cache import CachedNHLClient
+from utils.tracing import configure_tracing
+
+
+
+
+# gunicorn 'main:create_app()', or main:app for the profile in LTL_PROFILE.
+# Importing main builds nothing, the app is built by create_app() and its
+# database, NHL client and sync scheduler by the first request using them.
+PROFILES = {
+    'production': {
+        'debug': False,
+        # templates are parsed once and kept, compiled ahead of time to
+        # bytecode in template_bytecode and all loaded when the app is built
+        'jinja_options': {'trim_blocks': True},
+        'template_bytecode': str(Path('database', 'template_cache')),
+        'precompile_templates': True,
+    },
+    'development': {
+        'debug': True,
+        # every render parses its template again so edits show up
+        'jinja_options': {'trim_blocks': True, 'cache_size': 0},
+        'template_bytecode': None,
+        'precompile_templates': False,
+    },
+}
+DEFAULT_PROFILE = 'production'
+
+
+def create_app(profile=None, nhl=None, db_dir=None, scheduler=True) -> Flask:
+    # profile is a name from PROFILES or a settings dict shaped like one
+    if isinstance(profile, dict):
+        settings = profile
+    else:
+        settings = PROFILES[
+            profile or os.environ.get('LTL_PROFILE', DEFAULT_PROFILE)
+        ]
+
+    update_install_version()
+    version = get_version_number()
+
+    configure_tracing(
+        sample_rate=0.01,
+        slow_threshold=0.25,
+        slow_log=str(Path('database', 'slow_queries.log'))
+    )
+
+    if nhl is None:
+        nhl = Lazy(lambda: CachedNHLClient(NHLClient()))
+    sync_scheduler = None
+
+    def build_database():
+        db = Database(version, nhl, testing=False, db_dir=db_dir)
+        if sync_scheduler is not None:
+            sync_scheduler.start()
+        return db
+
+    db = Lazy(build_database)
+    if scheduler:
+        sync_scheduler = SyncScheduler(db)
+
+    app = Flask(__name__)
+    app.config['DEBUG'] = settings['debug']
+    app.config['TEMPLATES_AUTO_RELOAD'] = settings['debug']
+
+    app.jinja_options = dict(settings['jinja_options'])
+    if settings['template_bytecode'] is not None:
+        Path(settings['template_bytecode']).mkdir(exist_ok=True)
+        app.jinja_options['bytecode_cache'] = FileSystemBytecodeCache(
+            settings['template_bytecode']
+        )
+    if settings['precompile_templates']:
+        precompile_templates(app)
+
+    public = Public(app, db)
+    api = API(app, db, sync_scheduler)
+    metrics = Metrics(app)
+
+    app.add_url_rule(
+        "/",
+        view_func=public.home
+    )
+    app.add_url_rule(
+        "/database/games",
+        view_func=api.games
+    )
+    app.add_url_rule(
+        "/api/sync",
+        view_func=api.sync
+    )
+    app.add_url_rule(
+        "/database/stats",
+        view_func=api.stats
+    )
+    app.add_url_rule(
+        "/info/upcoming_games",
+        view_func=api.upcoming_games
+    )
+    app.add_url_rule(
+        "/api/cache_stats",
+        view_func=api.cache_stats
+    )
+    app.add_url_rule(
+        "/stream/games",
+        view_func=api.stream_games
+    )
+    app.add_url_rule(
+        "/metrics",
+        view_func=metrics.metrics
+    )
+    app.add_url_rule(
+        "/api/sql_trace",
+        view_func=metrics.sql_trace
+    )
+    return app
+
+
+def precompile_templates(app: Flask):
+    # loads every template into the environment's cache, from the bytecode
+    # cache when it has them
+    env = app.jinja_env
+    for name in env.list_templates():
+        env.get_template(name)
+
+
+def __getattr__(name):
+    # main:app for gunicorn and flask, built on first use
+    global app
+    if name == 'app':
+        app = create_app()
+        return app
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+
 test = 'test'
@@ -0,0 +1,89 @@
+import os
+from threading import Lock
+from weakref import WeakMethod
+
+
+###############################################################################
+
+
+class ChangeTracker:
+    # monotonically increasing write counters per table, bumped by the
+    # connection pool once a transaction that changed rows has committed
+    def __init__(self):
+        self._versions = {}
+        self._lock = Lock()
+        self._listeners = []
+
+
+    #------------------------------------------------------#
+
+
+    def bump(self, *table_names):
+        with self._lock:
+            for name in table_names:
+                self._versions[name] = self._versions.get(name, 0) + 1
+        for listener in self._live_listeners():
+            listener(table_names)
+
+
+    def version(self, *table_names) -> int:
+        # the sum only grows, so any write to any of the tables changes it
+        versions = self._versions
+        return sum(versions.get(name, 0) for name in table_names)
+
+
+    def signature(self, db_dir: str, *table_names) -> str:
+        # writes made by other processes (gunicorn workers) never reach this
+        # process's counters, so the database files' stat is mixed in
+        parts = [str(self.version(*table_names))]
+        for path in (db_dir, f'{db_dir}-wal'):
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            parts.append(f'{stat.st_mtime_ns:x}.{stat.st_size:x}')
+        return '-'.join(parts)
+
+
+    def subscribe(self, listener):
+        # listener(table_names) runs on the writing thread after each commit.
+        # Bound methods are held weakly, so a FragmentCache dropped along
+        # with its app stops listening instead of being kept alive here
+        if hasattr(listener, '__self__'):
+            held = WeakMethod(listener)
+        else:
+            held = lambda: listener
+        with self._lock:
+            self._listeners.append(held)
+
+
+    def unsubscribe(self, listener):
+        with self._lock:
+            self._listeners = [
+                held for held in self._listeners
+                if held() is not None and held() != listener
+            ]
+
+
+    #::::::::::::::::::::::::::::::::::::::::::::::::::::::#
+
+
+    def _live_listeners(self) -> list:
+        with self._lock:
+            listeners = [held() for held in self._listeners]
+            if None in listeners:
+                self._listeners = [
+                    held for held, listener
+                    in zip(self._listeners, listeners)
+                    if listener is not None
+                ]
+        return [listener for listener in listeners if listener is not None]
+
+
+###############################################################################
+
+
+changes = ChangeTracker()
+
+
+###############################################################################
@@ -1,5 +1,8 @@
 from operator import itemgetter
 
+from .connections import get_pool
+from .rows import RowMapper, fetch_columns
+
 
 class SQLiteTable:
     # override in the child class
@@ -20,21 +23,48 @@ class SQLiteTable:
         pass
 
 
+    # bulk reads without building a dataclass per row
+    def read_all_tuples(self) -> list[tuple]:
+        with self._connection(readonly=True) as con:
+            cur = con.cursor()
+            sql = f'SELECT * FROM {self._table_name}'
+            cur.execute(sql)
+            return cur.fetchall()
+
+
+    def read_all_columns(self) -> dict[str, list]:
+        with self._connection(readonly=True) as con:
+            cur = con.cursor()
+            sql = f'SELECT * FROM {self._table_name}'
+            cur.execute(sql)
+            return fetch_columns(cur)
+
+
     #::::::::::::::::::::::::::::::::::::::::::::::::::::::# 
 
 
-    def _dataclass_row_factory(self, cur, row):
-        fields = [column[0] for column in cur.description]
-        as_dict = {key: value for key, value in zip(fields, row)}
+    def _connection(self, readonly=False):
+        # writes committed through here bump the table's change version,
+        # readonly connections never wait on the writer
+        return get_pool(self.db_dir).connection(
+            self._table_name,
+            readonly=readonly
+        )
+
 
-        # DEBUG LOGGING
-        # print(self._table_name, 'row_factory', as_dict)
-        
-        return self.dataclass(**as_dict)
+    @property
+    def _dataclass_row_factory(self):
+        # one RowMapper per table, it keeps the column mapping of the last
+        # query so rows are built without looking at cur.description
+        try:
+            return self._row_mapper
+        except AttributeError:
+            self._row_mapper = RowMapper(self.dataclass)
+            return self._row_mapper
 
 
     def _reset_table(self):
-        with sqlite3.connect(self.db_dir) as con:
+        with self._connection() as con:
             cur = con.cursor()
             sql = f'DROP TABLE {self._table_name}'
             cur.execute(sql)
@@ -0,0 +1,364 @@
+import atexit
+import sqlite3
+import sys
+from contextlib import contextmanager
+from queue import LifoQueue, Empty, Full
+from threading import local, Lock
+from time import perf_counter
+
+from .changes import changes
+from .metrics import sql_duration, sql_fetch_duration
+from .tracing import tracer
+
+
+###############################################################################
+
+
+DEFAULT_POOL_SIZE = 5
+DEFAULT_CACHED_STATEMENTS = 256
+
+# storage settings, applied to every connection the pools open. WAL lets
+# readers keep reading while the writer commits, synchronous=NORMAL only
+# syncs at checkpoints in WAL mode, and busy_timeout makes a connection wait
+# for another process' lock instead of raising 'database is locked'.
+DEFAULT_JOURNAL_MODE = 'WAL'
+DEFAULT_SYNCHRONOUS = 'NORMAL'
+DEFAULT_BUSY_TIMEOUT = 10.0
+
+
+###############################################################################
+
+
+class MeteredCursor(sqlite3.Cursor):
+    # times every statement, labelled with the qualified name of the method
+    # that ran it (GamesTable.read_all, Database.get_join_games, ...), and
+    # hands it to the tracer
+    _pending = None
+
+    def execute(self, sql, parameters=()):
+        method = sys._getframe(1).f_code.co_qualname
+        start = perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            elapsed = perf_counter() - start
+            sql_duration.observe(elapsed, method=method)
+            self._pending = tracer.executed(
+                self,
+                method,
+                sql,
+                parameters,
+                elapsed
+            )
+
+
+    def executemany(self, sql, seq_of_parameters):
+        method = sys._getframe(1).f_code.co_qualname
+        start = perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            elapsed = perf_counter() - start
+            sql_duration.observe(elapsed, method=method)
+            self._pending = tracer.executed(
+                self,
+                method,
+                sql,
+                None,
+                elapsed,
+                many=True
+            )
+
+
+    def fetchall(self):
+        # stepping the rest of the rows and building them is timed apart
+        # from the execute
+        method = sys._getframe(1).f_code.co_qualname
+        start = perf_counter()
+        rows = super().fetchall()
+        elapsed = perf_counter() - start
+        sql_fetch_duration.observe(elapsed, method=method)
+        self._fetched(elapsed, len(rows))
+        return rows
+
+
+    def fetchone(self):
+        start = perf_counter()
+        row = super().fetchone()
+        self._fetched(perf_counter() - start, int(row is not None))
+        return row
+
+
+    def _fetched(self, elapsed, rows):
+        if self._pending is not None:
+            tracer.fetched(self, self._pending, elapsed, rows)
+            self._pending = None
+
+
+class MeteredConnection(sqlite3.Connection):
+    def cursor(self, factory=MeteredCursor):
+        return super().cursor(factory)
+
+
+###############################################################################
+
+
+class ConnectionPool:
+    # one writer connection, shared by the threads of this process one
+    # transaction at a time, and a pool of query_only reader connections
+    def __init__(
+        self,
+        db_dir: str,
+        size: int = DEFAULT_POOL_SIZE,
+        cached_statements: int = DEFAULT_CACHED_STATEMENTS,
+        journal_mode: str = DEFAULT_JOURNAL_MODE,
+        synchronous: str = DEFAULT_SYNCHRONOUS,
+        busy_timeout: float = DEFAULT_BUSY_TIMEOUT
+    ):
+        self.db_dir = db_dir
+        # size is the number of idle reader connections kept open between
+        # uses, a size of 0 opens and closes a connection for every use
+        self.size = size
+        self.cached_statements = cached_statements
+        self.journal_mode = journal_mode
+        self.synchronous = synchronous
+        self.busy_timeout = busy_timeout
+
+        self._idle = LifoQueue(maxsize=size) if size > 0 else None
+        self._writer = None
+        self._write_lock = Lock()
+        self._local = local()
+        self._lock = Lock()
+        self._closed = False
+        self.opened = 0
+        self.writes = 0
+        self.reads = 0
+        # write transactions that committed changes, one sync of the
+        # journal each with synchronous=FULL
+        self.commits = 0
+
+
+    #------------------------------------------------------#
+
+
+    @contextmanager
+    def connection(self, name=None, readonly=False):
+        # nested calls on the same thread share the outer connection, so
+        # they also share (and commit with) the outer transaction. Reads
+        # inside a write transaction use the writer and see its changes.
+        held = getattr(self._local, 'con', None)
+        if held is None and readonly:
+            held = getattr(self._local, 'reader', None)
+
+        if held is not None:
+            before = held.total_changes
+            yield held
+            if name is not None and held.total_changes != before:
+                self._local.touched.add(name)
+            return
+
+        if readonly:
+            with self._read() as con:
+                yield con
+            return
+
+        with self._write_lock:
+            con = self._acquire_writer()
+            self._local.con = con
+            self._local.touched = set()
+            self._local.callbacks = []
+            try:
+                with con:
+                    before = con.total_changes
+                    yield con
+                    changed = con.total_changes != before
+                    if name is not None and changed:
+                        self._local.touched.add(name)
+                if changed:
+                    self.commits += 1
+            finally:
+                touched = self._local.touched
+                callbacks = self._local.callbacks
+                self._local.con = None
+                self._local.touched = set()
+                self._local.callbacks = []
+                self._release_writer(con)
+                self.writes += 1
+
+        # only reached once the transaction has committed
+        if touched:
+            changes.bump(*touched)
+        for callback in callbacks:
+            callback()
+
+
+    def on_commit(self, callback):
+        # runs callback once the current transaction on this thread has
+        # committed (dropped on rollback), or right away outside of one
+        if getattr(self._local, 'con', None) is None:
+            callback()
+            return
+        self._local.callbacks.append(callback)
+
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+        with self._write_lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+        if self._idle is None:
+            return
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except Empty:
+                break
+
+
+    @property
+    def stats(self):
+        return {
+            'db_dir': self.db_dir,
+            'size': self.size,
+            'opened': self.opened,
+            'idle': self._idle.qsize() if self._idle is not None else 0,
+            'writes': self.writes,
+            'commits': self.commits,
+            'reads': self.reads,
+            'journal_mode': self.journal_mode,
+            'synchronous': self.synchronous,
+            'busy_timeout': self.busy_timeout
+        }
+
+
+    #::::::::::::::::::::::::::::::::::::::::::::::::::::::#
+
+
+    @contextmanager
+    def _read(self):
+        con = self._acquire_reader()
+        self._local.reader = con
+        try:
+            yield con
+        finally:
+            self._local.reader = None
+            # ends the read snapshot so the WAL can be checkpointed
+            if con.in_transaction:
+                con.rollback()
+            self._release_reader(con)
+            self.reads += 1
+
+
+    def _connect(self, readonly: bool) -> sqlite3.Connection:
+        with self._lock:
+            if self._closed:
+                raise sqlite3.ProgrammingError(
+                    f'connection pool for {self.db_dir} is closed'
+                )
+            self.opened += 1
+
+        con = sqlite3.connect(
+            self.db_dir,
+            timeout=self.busy_timeout,
+            cached_statements=self.cached_statements,
+            check_same_thread=False,
+            factory=MeteredConnection,
+            # take the write lock when the transaction starts, so it waits
+            # on busy_timeout instead of failing on a lock upgrade
+            isolation_level=None if readonly else 'IMMEDIATE'
+        )
+        if readonly:
+            con.execute('PRAGMA query_only = ON')
+        else:
+            # persistent, stored in the database file
+            con.execute(f'PRAGMA journal_mode = {self.journal_mode}')
+        con.execute(f'PRAGMA synchronous = {self.synchronous}')
+        return con
+
+
+    def _acquire_writer(self) -> sqlite3.Connection:
+        # called with the write lock held
+        if self._writer is not None:
+            con, self._writer = self._writer, None
+            return con
+        return self._connect(readonly=False)
+
+
+    def _release_writer(self, con: sqlite3.Connection):
+        if self._idle is None or self._closed:
+            con.close()
+            return
+        self._writer = con
+
+
+    def _acquire_reader(self) -> sqlite3.Connection:
+        if self._idle is not None:
+            try:
+                return self._idle.get_nowait()
+            except Empty:
+                pass
+        return self._connect(readonly=True)
+
+
+    def _release_reader(self, con: sqlite3.Connection):
+        if self._idle is None or self._closed:
+            con.close()
+            return
+        try:
+            self._idle.put_nowait(con)
+        except Full:
+            con.close()
+
+
+###############################################################################
+
+
+_pools = {}
+_pools_lock = Lock()
+_pool_settings = {
+    'size': DEFAULT_POOL_SIZE,
+    'cached_statements': DEFAULT_CACHED_STATEMENTS,
+    'journal_mode': DEFAULT_JOURNAL_MODE,
+    'synchronous': DEFAULT_SYNCHRONOUS,
+    'busy_timeout': DEFAULT_BUSY_TIMEOUT
+}
+
+
+def get_pool(db_dir: str) -> ConnectionPool:
+    try:
+        return _pools[db_dir]
+    except KeyError:
+        pass
+
+    with _pools_lock:
+        if db_dir not in _pools:
+            _pools[db_dir] = ConnectionPool(db_dir, **_pool_settings)
+        return _pools[db_dir]
+
+
+def configure_pools(**settings):
+    # closes the existing pools, the next get_pool() call for a database
+    # builds a fresh pool with the new settings. Takes any ConnectionPool
+    # argument but db_dir, None keeps the current setting.
+    for key, value in settings.items():
+        if key not in _pool_settings:
+            raise TypeError(f'unknown pool setting {key}')
+        if value is not None:
+            _pool_settings[key] = value
+    close_pools()
+
+
+def close_pools():
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
+
+
+atexit.register(close_pools)
+
+
+###############################################################################
@@ -0,0 +1,104 @@
+from collections import OrderedDict
+from threading import Lock
+
+from .changes import changes
+
+
+###############################################################################
+
+
+DEFAULT_MAX_BYTES = 8 * 1024 * 1024
+
+
+###############################################################################
+
+
+class FragmentCache:
+    # LRU cache of rendered html fragments, capped by the total size of the
+    # cached strings. Entries remember the tables they were rendered from
+    # and are dropped as soon as one of those tables is written.
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = Lock()
+        changes.subscribe(self.invalidate)
+
+
+    #------------------------------------------------------#
+
+
+    def get(self, key) -> str | None:
+        with self._lock:
+            try:
+                html, tables = self._entries[key]
+            except KeyError:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return html
+
+
+    def put(self, key, html: str, tables):
+        size = len(html)
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (html, frozenset(tables))
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+
+
+    def close(self):
+        # stops listening for writes and drops every entry
+        changes.unsubscribe(self.invalidate)
+        self.clear()
+
+
+    def invalidate(self, table_names):
+        table_names = set(table_names)
+        with self._lock:
+            stale = [
+                key for key, (_, tables) in self._entries.items()
+                if tables & table_names
+            ]
+            for key in stale:
+                self._drop(key)
+
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+
+    @property
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'bytes': self._bytes,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': self.hits / lookups if lookups else 0.0
+        }
+
+
+    #::::::::::::::::::::::::::::::::::::::::::::::::::::::#
+
+
+    def _drop(self, key):
+        html, _ = self._entries.pop(key)
+        self._bytes -= len(html)
+
+
+###############################################################################
@@ -0,0 +1,111 @@
+from collections import deque
+from threading import Condition, Lock
+
+
+###############################################################################
+
+
+HEARTBEAT = ': keepalive\n\n'
+HEARTBEAT_INTERVAL = 15
+SUBSCRIPTION_BUFFER = 256
+
+
+###############################################################################
+
+
+class Subscription:
+    # one client's mailbox. A client that falls more than maxlen messages
+    # behind loses the oldest ones instead of holding up the publisher.
+    def __init__(self, hub, maxlen: int = SUBSCRIPTION_BUFFER):
+        self.hub = hub
+        self.closed = False
+        self.dropped = 0
+
+        self._messages = deque(maxlen=maxlen)
+        self._ready = Condition()
+
+
+    def __iter__(self):
+        # yields messages, or a heartbeat after every quiet interval, until
+        # the subscription is closed
+        while not self.closed:
+            message = self.get(HEARTBEAT_INTERVAL)
+            yield HEARTBEAT if message is None else message
+
+
+    #------------------------------------------------------#
+
+
+    def put(self, message: str):
+        with self._ready:
+            if len(self._messages) == self._messages.maxlen:
+                self.dropped += 1
+            self._messages.append(message)
+            self._ready.notify()
+
+
+    def get(self, timeout=None) -> str | None:
+        with self._ready:
+            if not self._messages:
+                self._ready.wait(timeout)
+            if not self._messages:
+                return None
+            return self._messages.popleft()
+
+
+    def close(self):
+        self.closed = True
+        self.hub.unsubscribe(self)
+        with self._ready:
+            self._ready.notify()
+
+
+###############################################################################
+
+
+class Hub:
+    # fans messages from one producer out to every subscriber, the
+    # publisher never blocks on a slow client
+    def __init__(self):
+        self._subscribers = set()
+        self._lock = Lock()
+        self.published = 0
+
+
+    #------------------------------------------------------#
+
+
+    def subscribe(self, maxlen: int = SUBSCRIPTION_BUFFER) -> Subscription:
+        subscription = Subscription(self, maxlen)
+        with self._lock:
+            self._subscribers.add(subscription)
+        return subscription
+
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+
+    def publish(self, message: str):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            subscription.put(message)
+        self.published += 1
+
+
+    @property
+    def subscribers(self) -> int:
+        return len(self._subscribers)
+
+
+###############################################################################
+
+
+def sse_message(event: str, data: str) -> str:
+    lines = ''.join(f'data: {line}\n' for line in data.splitlines())
+    return f'event: {event}\n{lines}\n'
+
+
+###############################################################################
@@ -0,0 +1,37 @@
+from threading import Lock
+
+
+###############################################################################
+
+
+class Lazy:
+    # stands in for the object build() returns, which is only built the
+    # first time one of its attributes is used, once across threads
+    def __init__(self, build):
+        self._build = build
+        self._lock = Lock()
+        self._target = None
+
+
+    def __getattr__(self, name):
+        return getattr(self.target, name)
+
+
+    #------------------------------------------------------#
+
+
+    @property
+    def built(self) -> bool:
+        return self._target is not None
+
+
+    @property
+    def target(self):
+        if self._target is None:
+            with self._lock:
+                if self._target is None:
+                    self._target = self._build()
+        return self._target
+
+
+###############################################################################
@@ -0,0 +1,241 @@
+from bisect import bisect_left
+from contextlib import contextmanager
+from threading import Lock
+from time import perf_counter
+
+
+###############################################################################
+
+
+# seconds, from a cached statement up to a slow sync
+DEFAULT_BUCKETS = (
+    0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0
+)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+###############################################################################
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = Lock()
+
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+
+    def render(self) -> list[str]:
+        lines = [
+            f'# HELP {self.name} {self.documentation}',
+            f'# TYPE {self.name} counter'
+        ]
+        with self._lock:
+            values = sorted(self._values.items())
+        for key, value in values:
+            lines.append(f'{self.name}{self._format(key)} {value}')
+        return lines
+
+
+    #::::::::::::::::::::::::::::::::::::::::::::::::::::::#
+
+
+    def _key(self, labels) -> tuple:
+        return tuple(str(labels[label]) for label in self.labels)
+
+
+    def _format(self, key, extra=()) -> str:
+        pairs = list(zip(self.labels, key)) + list(extra)
+        if not pairs:
+            return ''
+        return '{' + ','.join(
+            f'{label}="{escape(value)}"' for label, value in pairs
+        ) + '}'
+
+
+class Histogram(Counter):
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels=(),
+        buckets=DEFAULT_BUCKETS
+    ):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                # [count per bucket (+Inf last), sum]
+                series = self._values[key] = [
+                    [0] * (len(self.buckets) + 1),
+                    0.0
+                ]
+            series[0][i] += 1
+            series[1] += value
+
+
+    @contextmanager
+    def time(self, **labels):
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(perf_counter() - start, **labels)
+
+
+    def count(self, **labels) -> int:
+        series = self._values.get(self._key(labels))
+        return 0 if series is None else sum(series[0])
+
+
+    def render(self) -> list[str]:
+        lines = [
+            f'# HELP {self.name} {self.documentation}',
+            f'# TYPE {self.name} histogram'
+        ]
+        with self._lock:
+            values = sorted(
+                (key, (list(counts), total))
+                for key, (counts, total) in self._values.items()
+            )
+        bounds = [str(bucket) for bucket in self.buckets] + ['+Inf']
+        for key, (counts, total) in values:
+            cumulative = 0
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                labels = self._format(key, [('le', bound)])
+                lines.append(f'{self.name}_bucket{labels} {cumulative}')
+            lines.append(f'{self.name}_sum{self._format(key)} {total}')
+            lines.append(f'{self.name}_count{self._format(key)} {cumulative}')
+        return lines
+
+
+###############################################################################
+
+
+class Registry:
+    # metrics of this process, rendered in the Prometheus text format. Each
+    # gunicorn worker keeps and serves its own.
+    def __init__(self):
+        self._metrics = {}
+        self._lock = Lock()
+
+
+    def counter(self, name, documentation, labels=()) -> Counter:
+        return self._get(Counter, name, documentation, labels)
+
+
+    def histogram(
+        self,
+        name,
+        documentation,
+        labels=(),
+        buckets=DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self._get(Histogram, name, documentation, labels, buckets)
+
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines += metric.render()
+        return '\n'.join(lines) + '\n'
+
+
+    #::::::::::::::::::::::::::::::::::::::::::::::::::::::#
+
+
+    def _get(self, kind, name, documentation, labels, *args):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = kind(
+                    name,
+                    documentation,
+                    labels,
+                    *args
+                )
+            elif type(metric) is not kind or metric.labels != tuple(labels):
+                raise ValueError(f'metric {name} is already registered')
+            return metric
+
+
+###############################################################################
+
+
+registry = Registry()
+
+http_requests = registry.counter(
+    'ltl_http_requests_total',
+    'Requests answered, by route, method and status.',
+    ('route', 'method', 'status')
+)
+http_duration = registry.histogram(
+    'ltl_http_request_duration_seconds',
+    'Time to build each response, by route and method.',
+    ('route', 'method')
+)
+http_sql_statements = registry.histogram(
+    'ltl_http_request_sql_statements',
+    'SQL statements run to build each response, by route.',
+    ('route',),
+    COUNT_BUCKETS
+)
+sql_duration = registry.histogram(
+    'ltl_sql_statement_duration_seconds',
+    'Time to execute each SQL statement, by the method that ran it.',
+    ('method',)
+)
+sql_fetch_duration = registry.histogram(
+    'ltl_sql_fetch_duration_seconds',
+    'Time to fetch and build the rows of a fetchall(), by method.',
+    ('method',)
+)
+nhl_requests = registry.counter(
+    'ltl_nhl_requests_total',
+    'NHL api calls, by endpoint and whether the cache answered.',
+    ('endpoint', 'source')
+)
+nhl_duration = registry.histogram(
+    'ltl_nhl_request_duration_seconds',
+    'Time spent on NHL api requests that missed the cache, by endpoint.',
+    ('endpoint',)
+)
+sync_duration = registry.histogram(
+    'ltl_sync_stage_duration_seconds',
+    'Time spent in each stage of a sync.',
+    ('stage',)
+)
+
+
+def escape(value: str) -> str:
+    return (
+        value
+        .replace('\\', '\\\\')
+        .replace('"', '\\"')
+        .replace('\n', '\\n')
+    )
+
+
+###############################################################################
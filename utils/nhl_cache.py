@@ -0,0 +1,242 @@
+import json
+import os
+import zlib
+from hashlib import sha1
+from pathlib import Path
+from threading import Lock
+from time import time
+
+from .metrics import nhl_requests, nhl_duration
+
+
+###############################################################################
+
+
+CACHE_DIR = Path('database', 'nhl_cache')
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+SCHEDULE_TTL = 6 * 60 * 60
+TEAMS_TTL = 24 * 60 * 60
+
+# boxscores in these states never change again
+FINISHED_STATES = ['OFF']
+
+
+###############################################################################
+
+
+class DiskCache:
+    # zlib compressed json files, one per key. The total size on disk is
+    # capped, evicting the least recently used files first.
+    def __init__(self, cache_dir=CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._lock = Lock()
+        # path -> (size, last used), rebuilt from the directory on start
+        self._index = {}
+        self._bytes = 0
+        for entry in os.scandir(self.cache_dir):
+            if entry.is_file() and entry.name.endswith('.json.z'):
+                stat = entry.stat()
+                self._index[entry.path] = (stat.st_size, stat.st_mtime)
+                self._bytes += stat.st_size
+
+
+    #------------------------------------------------------#
+
+
+    def get(self, key: str):
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                envelope = json.loads(zlib.decompress(f.read()))
+        except (FileNotFoundError, zlib.error, ValueError):
+            self.misses += 1
+            return None
+
+        expires = envelope['expires']
+        if expires is not None and expires < time():
+            self.misses += 1
+            self._remove(path)
+            return None
+
+        with self._lock:
+            if path in self._index:
+                self._index[path] = (self._index[path][0], time())
+        self.hits += 1
+        return envelope['data']
+
+
+    def put(self, key: str, data, ttl=None):
+        envelope = {
+            'key': key,
+            'expires': None if ttl is None else time() + ttl,
+            'data': data
+        }
+        payload = zlib.compress(
+            json.dumps(envelope, separators=(',', ':')).encode()
+        )
+        if len(payload) > self.max_bytes:
+            return
+
+        path = self._path(key)
+        temp = f'{path}.{os.getpid()}.tmp'
+        with open(temp, 'wb') as f:
+            f.write(payload)
+        os.replace(temp, path)
+
+        with self._lock:
+            if path in self._index:
+                self._bytes -= self._index[path][0]
+            self._index[path] = (len(payload), time())
+            self._bytes += len(payload)
+            evicted = self._evict()
+
+        for path in evicted:
+            remove_file(path)
+
+
+    @property
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._index),
+            'bytes': self._bytes,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': self.hits / lookups if lookups else 0.0
+        }
+
+
+    #::::::::::::::::::::::::::::::::::::::::::::::::::::::#
+
+
+    def _path(self, key: str) -> str:
+        return str(self.cache_dir / f'{sha1(key.encode()).hexdigest()}.json.z')
+
+
+    def _evict(self) -> list[str]:
+        if self._bytes <= self.max_bytes:
+            return []
+        evicted = []
+        by_age = sorted(self._index.items(), key=lambda item: item[1][1])
+        for path, (size, _) in by_age:
+            if self._bytes <= self.max_bytes:
+                break
+            del self._index[path]
+            self._bytes -= size
+            evicted.append(path)
+        return evicted
+
+
+    def _remove(self, path):
+        with self._lock:
+            if path in self._index:
+                self._bytes -= self._index.pop(path)[0]
+        remove_file(path)
+
+
+###############################################################################
+
+
+class _Passthrough:
+    # forwards every attribute the wrapper does not define to the client
+    def __init__(self, wrapped):
+        self._wrapped = wrapped
+
+    def __getattr__(self, name):
+        return getattr(self._wrapped, name)
+
+
+class _Endpoints(_Passthrough):
+    def __init__(self, wrapped, cache):
+        super().__init__(wrapped)
+        self._cache = cache
+
+
+    def _cached(self, endpoint, key, fetch, ttl=None, keep=None):
+        # cached response for key, or fetch() stored for ttl seconds when
+        # keep(response) allows it
+        if (data := self._cache.get(key)) is not None:
+            nhl_requests.inc(endpoint=endpoint, source='cache')
+            return data
+
+        nhl_requests.inc(endpoint=endpoint, source='api')
+        with nhl_duration.time(endpoint=endpoint):
+            data = fetch()
+        if keep is None or keep(data):
+            self._cache.put(key, data, ttl)
+        return data
+
+
+class _Teams(_Endpoints):
+    def teams_info(self, date: str = 'now'):
+        return self._cached(
+            'teams_info',
+            f'teams_info/{date}',
+            lambda: self._wrapped.teams_info(date),
+            TEAMS_TTL
+        )
+
+
+class _Schedule(_Endpoints):
+    def __init__(self, wrapped, cache, ttl):
+        super().__init__(wrapped, cache)
+        self._ttl = ttl
+
+
+    def get_season_schedule(self, team_abbr: str, season: str):
+        return self._cached(
+            'club-schedule-season',
+            f'club-schedule-season/{team_abbr}/{season}',
+            lambda: self._wrapped.get_season_schedule(
+                team_abbr=team_abbr,
+                season=season
+            ),
+            self._ttl
+        )
+
+
+class _GameCenter(_Endpoints):
+    def boxscore(self, game_id: str):
+        return self._cached(
+            'boxscore',
+            f'gamecenter/{game_id}/boxscore',
+            lambda: self._wrapped.boxscore(game_id),
+            # live and upcoming games are always fetched fresh
+            keep=lambda data: data.get('gameState') in FINISHED_STATES
+        )
+
+
+class CachedNHLClient(_Passthrough):
+    # drop-in for nhlpy.NHLClient that answers schedules (with a ttl) and
+    # finished-game boxscores (permanently) from a local disk cache
+    def __init__(
+        self,
+        nhl,
+        cache_dir=CACHE_DIR,
+        max_bytes=DEFAULT_MAX_BYTES,
+        schedule_ttl=SCHEDULE_TTL
+    ):
+        super().__init__(nhl)
+        self.cache = DiskCache(cache_dir, max_bytes)
+        self.teams = _Teams(nhl.teams, self.cache)
+        self.schedule = _Schedule(nhl.schedule, self.cache, schedule_ttl)
+        self.game_center = _GameCenter(nhl.game_center, self.cache)
+
+
+###############################################################################
+
+
+def remove_file(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+###############################################################################
@@ -0,0 +1,66 @@
+from dataclasses import fields
+from operator import itemgetter
+
+
+###############################################################################
+
+
+class RowMapper:
+    # sqlite3 row factory building one dataclass per row. The column to
+    # field mapping is worked out once per cursor.description (once per
+    # executed query) instead of once per row, and objects are built
+    # positionally whenever the columns allow it.
+    def __init__(self, dataclass):
+        self.dataclass = dataclass
+        self.fields = tuple(field.name for field in fields(dataclass))
+        # (description, build), swapped as one so threads never mix them
+        self._plan = (None, None)
+
+
+    def __call__(self, cur, row):
+        description, build = self._plan
+        if description is not cur.description:
+            description = cur.description
+            build = self._build_for(column_names(description))
+            self._plan = (description, build)
+        return build(row)
+
+
+    #::::::::::::::::::::::::::::::::::::::::::::::::::::::#
+
+
+    def _build_for(self, names: tuple):
+        cls = self.dataclass
+
+        # the columns are the fields in order, missing only defaulted ones
+        if names == self.fields[:len(names)]:
+            return lambda row: cls(*row)
+
+        # same fields in another order
+        if sorted(names) == sorted(self.fields):
+            getter = itemgetter(*(names.index(name) for name in self.fields))
+            return lambda row: cls(*getter(row))
+
+        return lambda row: cls(**dict(zip(names, row)))
+
+
+###############################################################################
+
+
+def column_names(description) -> tuple[str]:
+    return tuple(column[0] for column in description)
+
+
+def fetch_columns(cur) -> dict[str, list]:
+    # columnar result of an executed cursor, {column: [values]}
+    names = column_names(cur.description)
+    rows = cur.fetchall()
+    if not rows:
+        return {name: [] for name in names}
+    return {
+        name: list(values)
+        for name, values in zip(names, zip(*rows))
+    }
+
+
+###############################################################################
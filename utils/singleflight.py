@@ -0,0 +1,135 @@
+import json
+import os
+from threading import Event, Lock
+from time import time
+
+try:
+    import fcntl
+except ImportError:
+    # no flock on windows, calls are only coalesced within a process
+    fcntl = None
+
+
+###############################################################################
+
+
+class _Call:
+    def __init__(self):
+        self.done = Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    # coalesces overlapping calls: while one call is running, every other
+    # caller waits for it and shares its result instead of running again.
+    # With a lock_path, callers in other processes holding the same path
+    # (gunicorn workers) are coalesced too, through an flock on lock_path
+    # and the last result saved next to it. Results must be json.
+    def __init__(self, lock_path: str | None = None):
+        self.lock_path = lock_path
+        self.result_path = None if lock_path is None else f'{lock_path}.json'
+        self.runs = 0
+        self.shared = 0
+        self.shared_across_processes = 0
+
+        self._lock = Lock()
+        self._call = None
+
+
+    #------------------------------------------------------#
+
+
+    def do(self, func):
+        with self._lock:
+            call = self._call
+            leader = call is None
+            if leader:
+                call = self._call = _Call()
+
+        if not leader:
+            call.done.wait()
+            self.shared += 1
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = self._run_locked(func)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._call = None
+            call.done.set()
+
+
+    @property
+    def last_result(self):
+        # {'finished': timestamp, 'result': result} of the last call any
+        # process saved, None before the first one
+        if self.result_path is None:
+            return None
+        return self._load()
+
+
+    @property
+    def stats(self):
+        return {
+            'runs': self.runs,
+            'shared': self.shared,
+            'shared_across_processes': self.shared_across_processes
+        }
+
+
+    #::::::::::::::::::::::::::::::::::::::::::::::::::::::#
+
+
+    def _run_locked(self, func):
+        if self.lock_path is None or fcntl is None:
+            return self._run(func)
+
+        called = time()
+        with open(self.lock_path, 'a') as lock:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                # another process is running it, wait for it to finish and
+                # take its result, unless it failed without saving one
+                fcntl.flock(lock, fcntl.LOCK_EX)
+                saved = self._load()
+                if saved is not None and saved['finished'] >= called:
+                    self.shared_across_processes += 1
+                    return saved['result']
+
+            try:
+                result = self._run(func)
+                self._save(result)
+                return result
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+    def _run(self, func):
+        self.runs += 1
+        return func()
+
+
+    def _load(self):
+        try:
+            with open(self.result_path) as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+
+    def _save(self, result):
+        temp = f'{self.result_path}.{os.getpid()}.tmp'
+        with open(temp, 'w') as f:
+            json.dump({'finished': time(), 'result': result}, f)
+        os.replace(temp, self.result_path)
+
+
+###############################################################################
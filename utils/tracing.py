@@ -0,0 +1,236 @@
+import logging
+import os
+import random
+import sqlite3
+from threading import Lock, local
+
+
+###############################################################################
+
+
+SLOW_LOG = 'light_the_lamp.slow_sql'
+# distinct (call site, statement) pairs kept, the rest only reach metrics
+MAX_SITES = 2000
+
+
+###############################################################################
+
+
+class _Pending:
+    # a sampled SELECT that was executed but not fetched yet
+    __slots__ = ('method', 'sql', 'parameters', 'elapsed')
+
+    def __init__(self, method, sql, parameters, elapsed):
+        self.method = method
+        self.sql = sql
+        self.parameters = parameters
+        self.elapsed = elapsed
+
+
+class SQLTracer:
+    # opt-in statement tracing for the metered connections. A sample_rate
+    # share of statements is aggregated per call site (method and
+    # statement): calls, seconds, rows and the shape of the parameters.
+    # Every statement slower than slow_threshold seconds, sampled or not,
+    # is logged with its EXPLAIN QUERY PLAN.
+    def __init__(self):
+        self.sample_rate = 0.0
+        self.slow_threshold = None
+        self.enabled = False
+        self.slow_queries = 0
+
+        self._sites = {}
+        self._plans = {}
+        self._lock = Lock()
+        self._local = local()
+        self._logger = logging.getLogger(SLOW_LOG)
+        self._handler = None
+
+
+    #------------------------------------------------------#
+
+
+    def configure(self, sample_rate=0.0, slow_threshold=None, slow_log=None):
+        # slow_log is a file path, slow queries go to the 'SLOW_LOG' logger
+        # and from there to wherever logging sends them otherwise. Calling
+        # it again replaces the file handler it installed before
+        self.sample_rate = sample_rate
+        self.slow_threshold = slow_threshold
+        self.enabled = sample_rate > 0 or slow_threshold is not None
+        if self._handler is not None:
+            if slow_log is not None and self._handler.baseFilename == (
+                os.path.abspath(slow_log)
+            ):
+                return
+            self._logger.removeHandler(self._handler)
+            self._handler.close()
+            self._handler = None
+        if slow_log is not None:
+            self._handler = logging.FileHandler(slow_log)
+            self._handler.setFormatter(
+                logging.Formatter('%(asctime)s %(message)s')
+            )
+            self._logger.addHandler(self._handler)
+            self._logger.setLevel(logging.INFO)
+
+
+    def reset(self):
+        with self._lock:
+            self._sites.clear()
+            self._plans.clear()
+        self.slow_queries = 0
+
+
+    def begin_scope(self):
+        # counts the statements this thread runs until end_scope()
+        self._local.statements = 0
+
+
+    def end_scope(self) -> int:
+        statements = getattr(self._local, 'statements', 0)
+        self._local.statements = None
+        return statements
+
+
+    def executed(self, cur, method, sql, parameters, elapsed, many=False):
+        # called by the cursor after every execute, returns what fetched()
+        # needs for statements that return rows. Sampling is decided first,
+        # the statements left out of it only have their time checked
+        # against slow_threshold, which needs no _Pending
+        if getattr(self._local, 'statements', None) is not None:
+            self._local.statements += 1
+        if not self.enabled:
+            return None
+
+        sampled = self.sample_rate > 0 and random.random() < self.sample_rate
+        if not sampled and self.slow_threshold is None:
+            return None
+        if many:
+            parameters = None
+        if cur.description is not None:
+            if sampled:
+                return _Pending(method, sql, parameters, elapsed)
+            return (method, sql, parameters, elapsed)
+
+        rows = max(cur.rowcount, 0)
+        self._finish(cur, method, sql, parameters, elapsed, rows, sampled)
+        return None
+
+
+    def fetched(self, cur, pending, elapsed, rows):
+        # pending is a _Pending when the statement was sampled, otherwise
+        # the (method, sql, parameters, elapsed) of the slow check
+        if pending is None:
+            return
+        if pending.__class__ is tuple:
+            method, sql, parameters, executed = pending
+            self._finish(
+                cur, method, sql, parameters, executed + elapsed, rows, False
+            )
+            return
+        self._finish(
+            cur,
+            pending.method,
+            pending.sql,
+            pending.parameters,
+            pending.elapsed + elapsed,
+            rows,
+            True
+        )
+
+
+    def report(self, limit=50) -> list[dict]:
+        # the call sites that took the most time first
+        with self._lock:
+            sites = [dict(site) for site in self._sites.values()]
+        sites.sort(key=lambda site: site['seconds'], reverse=True)
+        return sites[:limit]
+
+
+    #::::::::::::::::::::::::::::::::::::::::::::::::::::::#
+
+
+    def _finish(self, cur, method, sql, parameters, elapsed, rows, sampled):
+        if sampled:
+            self._aggregate(method, sql, parameters, elapsed, rows)
+        slow_threshold = self.slow_threshold
+        if slow_threshold is not None and elapsed >= slow_threshold:
+            self._log_slow(cur, method, sql, parameters, elapsed, rows)
+
+
+    def _aggregate(self, method, sql, parameters, elapsed, rows):
+        statement = ' '.join(sql.split())
+        key = (method, statement)
+        with self._lock:
+            site = self._sites.get(key)
+            if site is None:
+                if len(self._sites) >= MAX_SITES:
+                    return
+                site = self._sites[key] = {
+                    'method': method,
+                    'sql': statement,
+                    'parameters': parameter_shape(parameters),
+                    'calls': 0,
+                    'seconds': 0.0,
+                    'max_seconds': 0.0,
+                    'rows': 0
+                }
+            site['calls'] += 1
+            site['seconds'] += elapsed
+            site['max_seconds'] = max(site['max_seconds'], elapsed)
+            site['rows'] += rows
+
+
+    def _log_slow(self, cur, method, sql, parameters, elapsed, rows):
+        self.slow_queries += 1
+        statement = ' '.join(sql.split())
+        plan = self._plans.get(statement)
+        if plan is None:
+            plan = self._plans[statement] = explain(
+                cur.connection,
+                sql,
+                parameters
+            )
+        self._logger.info(
+            f'{elapsed:.3f}s {method} rows={rows} '
+            f'params={parameter_shape(parameters)}\n'
+            f'\t{statement}\n\t{plan}'
+        )
+
+
+###############################################################################
+
+
+tracer = SQLTracer()
+
+
+def configure_tracing(sample_rate=0.0, slow_threshold=None, slow_log=None):
+    tracer.configure(sample_rate, slow_threshold, slow_log)
+
+
+def parameter_shape(parameters) -> str:
+    # the types, never the values
+    if parameters is None:
+        return 'many'
+    if isinstance(parameters, dict):
+        return '{' + ', '.join(
+            f'{key}: {type(value).__name__}'
+            for key, value in sorted(parameters.items())
+        ) + '}'
+    return '(' + ', '.join(type(value).__name__ for value in parameters) + ')'
+
+
+def explain(con, sql, parameters) -> str:
+    # plain sqlite3 cursor, so the plan itself is not metered or traced
+    if parameters is None:
+        return 'plan: unavailable for executemany'
+    try:
+        cur = sqlite3.Cursor(con)
+        cur.execute(f'EXPLAIN QUERY PLAN {sql}', parameters)
+        steps = [row[3] for row in cur.fetchall()]
+    except sqlite3.Error as e:
+        return f'plan: unavailable ({e})'
+    return 'plan: ' + '; '.join(steps)
+
+
+###############################################################################
@@ -0,0 +1,72 @@
+from threading import Event, Lock, Thread
+
+
+###############################################################################
+
+
+WATCH_INTERVAL = 1.0
+
+
+###############################################################################
+
+
+class ChangeWatcher:
+    # polls signature() on a background thread and calls on_change() when
+    # it differs from the previous poll. With the change tracker's
+    # signature this sees commits made by any process on the database,
+    # where the pool's on_commit hook only sees this process' own writes.
+    def __init__(self, signature, on_change, interval: float = WATCH_INTERVAL):
+        self.signature = signature
+        self.on_change = on_change
+        self.interval = interval
+
+        self.changes = 0
+        self.last_error = None
+
+        self._thread = None
+        self._stop = Event()
+        self._lock = Lock()
+
+
+    #------------------------------------------------------#
+
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = Thread(
+                target=self._run,
+                args=(self.signature(),),
+                name='change-watcher',
+                daemon=True
+            )
+            self._thread.start()
+
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+
+    #::::::::::::::::::::::::::::::::::::::::::::::::::::::#
+
+
+    def _run(self, last):
+        while not self._stop.wait(self.interval):
+            try:
+                signature = self.signature()
+                if signature == last:
+                    continue
+                self.on_change()
+                self.changes += 1
+                last = signature
+            except Exception as e:
+                # a failed check is retried on the next interval
+                self.last_error = repr(e)
+
+
+###############################################################################
@@ -1,2 +1,3 @@
 from .public import Public
 from .api import API
+from .metrics import Metrics
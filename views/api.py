@@ -1,12 +1,25 @@
 from io import StringIO
 from datetime import datetime
+from hashlib import sha1
+from threading import Lock
 from time import time
 
 import pytz
-from flask import render_template, request
+from flask import (
+    abort,
+    render_template,
+    get_template_attribute,
+    request,
+    make_response,
+    Response
+)
 from flask_htmx import HTMX
 
-from utils.dataclasses import JoinPlayerStats
+from database import JoinGamesQuery, JoinPlayerStatsQuery
+from utils.changes import changes
+from utils.fragment_cache import FragmentCache, DEFAULT_MAX_BYTES
+from utils.hub import Hub, sse_message
+from utils.watcher import ChangeWatcher
 
 
 ###############################################################################
@@ -15,122 +28,320 @@ from utils.dataclasses import JoinPlayerStats
 format = '%m/%d/%y @ %I:%M:%S %p'
 tz = pytz.timezone('America/Detroit')
 
+# tables each view reads from, for its ETag
+GAMES_TABLES = ('games', 'teams')
+STATS_TABLES = ('player_stats', 'games', 'teams', 'players')
+
 
 ###############################################################################
 
 
 class API:
-    def __init__(self, app, db):
+    def __init__(
+        self,
+        app,
+        db,
+        scheduler=None,
+        fragment_cache_bytes=DEFAULT_MAX_BYTES
+    ):
         self.app = app
         self.db = db
+        self.scheduler = scheduler
         self.htmx = HTMX(app)
+        self.fragments = FragmentCache(fragment_cache_bytes)
+
+        # one producer renders each changed game row once for every client.
+        # It diffs the games whenever the database changes, so every worker
+        # streams the writes of the one running the sync. Started by the
+        # first client so the database is not built just to create the app
+        self.game_stream = Hub()
+        self.game_watcher = ChangeWatcher(
+            lambda: changes.signature(self.db.games.db_dir, *GAMES_TABLES),
+            self._publish_changes
+        )
+        self._game_rows = None
+        self._last_game_rowid = 0
+        self._watch_lock = Lock()
 
 
     def games(self):
-        games = self.db.get_join_games()
-            # if I were to factor out the join tables into a new
-            # object I could get more in depth with filtering
-            # techniques qithout gumming up the database or api objects
-
-        for field, query in request.args.items():
-            match field:
-                case 'status':
-                    query = query.split(',')
-                    games = [
-                        game for game in games
-                        if game.status in query 
-                    ]
-                case 'team':
-                    query = query.split(',')
-                    games = [
-                        game for game in games
-                        or game.at_code in value
-                        if game.ht_code in value
-                    ]
-                case _:
-                    raise NotImplementedError
-
-        return render_template(
-            'database/games.html',
-            games=sorted(
-                games,
-                key=lambda game: game.start_time
-            ),
-            query_string=process_args(request)
+        # filters are pushed into the join query so only the rendered rows
+        # are loaded
+        query = JoinGamesQuery()
+        # a value that does not parse or an unknown order column is a bad
+        # request, not a server error
+        try:
+            for field, value in request.args.items():
+                match field:
+                    case 'status':
+                        query.status(split_arg(value))
+                    case 'team':
+                        query.team_codes(split_arg(value))
+                    case 'after':
+                        query.starts_after(float(value))
+                    case 'before':
+                        query.starts_before(float(value))
+                    case 'order':
+                        descending = value.startswith('-')
+                        query.order_by(value.lstrip('-'), descending)
+                    case 'limit':
+                        query.limit(
+                            int(value),
+                            int(request.args.get('offset', 0))
+                        )
+                    case 'offset':
+                        pass
+                    case _:
+                        raise NotImplementedError
+        except ValueError:
+            abort(400)
+
+        return self._conditional(
+            GAMES_TABLES,
+            lambda: render_template(
+                'database/games.html',
+                games=self.db.get_join_games(query=query),
+                query_string=process_args(request)
+            )
         )
 
 
     def stats(self):
-        queries = request.args.keys()
-        stats = []
-        if 'game' in queries:
-            rowid = int(request.args.get('game'))
-            stats = self.db.get_join_player_stats(
-                game_rowid=rowid
-            )
-        if 'single' in queries:
-            game, player = request.args.get('single').split(',')
-            stats += self.db.get_join_player_stats(
-                game_rowid=request.args.get('game'),
-                player_nhlid=request.args.get('player')
-            )
-        if 'player' in queries:
-            stats += self.db.get_join_player_stats(
-                player_nhlid=request.args.get('player')
-            )
-        
-        stats = {stat.as_tuple for stat in stats}
-        stats = [JoinPlayerStats(*stat) for stat in stats]
-        sorted_stats = sorted(stats, key=lambda stat: stat.team_code)
-        teams = {stat.team_code for stat in stats}
-        teams = list(teams)
+        return self._conditional(STATS_TABLES, self._render_stats)
+
+
+    def _render_stats(self):
+        # like games(), every filter is pushed into one join query. Without
+        # a filter nothing is listed rather than every line of the season
+        query = JoinPlayerStatsQuery()
+        filtered = False
+        try:
+            for field, value in request.args.items():
+                match field:
+                    case 'game':
+                        query.game_rowids(split_arg(value))
+                    case 'player':
+                        query.player_nhlids(split_arg(value))
+                    case 'single':
+                        game, player = value.split(',')
+                        query.game_rowid(int(game)).player_nhlid(int(player))
+                    case 'team':
+                        query.team_codes(split_arg(value))
+                    case 'opp':
+                        query.opp_codes(split_arg(value))
+                    case 'position':
+                        query.positions(split_arg(value))
+                    case 'after':
+                        query.starts_after(float(value))
+                    case 'before':
+                        query.starts_before(float(value))
+                    case 'order':
+                        descending = value.startswith('-')
+                        query.order_by(value.lstrip('-'), descending)
+                        continue
+                    case 'limit':
+                        query.limit(
+                            int(value),
+                            int(request.args.get('offset', 0))
+                        )
+                        continue
+                    case 'offset':
+                        continue
+                    case _:
+                        raise NotImplementedError
+                filtered = True
+        except ValueError:
+            abort(400)
+
+        stats = self.db.get_join_player_stats(query=query) if filtered else []
+        teams = list(dict.fromkeys(stat.team_code for stat in stats))
         return render_template(
             'database/stats.html',
             teams=teams,
-            stats=sorted_stats,
+            stats=stats,
             start_time=stats[0].local_start_time if stats != [] else None,
             query_string=process_args(request)
         )
 
 
     def upcoming_games(self):
-        games = self.db.games.read_by_status('FUT')
+        # cached per slate: the next FUT start time is part of the key, so
+        # the cached fragment moves on once that slate has started
+        slate = self.db.games.read_next_start_time('FUT', after=time())
+        return self._conditional(
+            GAMES_TABLES,
+            lambda: self._render_upcoming_games(slate),
+            variant=slate
+        )
 
-        start_times = {
-            game.start_time 
-            for game in games
-            if game.is_after(time())
-        }
-        start_times = list(start_times)
-        start_times.sort()
-        next_games = self.db.games.read_by_start_time(start_times[0])
-        next_games = [
-            self.db.get_join_games(game_rowid=game.rowid)
-            for game in next_games
-        ]
+
+    def _render_upcoming_games(self, slate):
+        # the whole slate comes back in one joined query, empty once there
+        # are no FUT games left
+        next_games = []
+        if slate is not None:
+            next_games = self.db.get_join_games(
+                query=JoinGamesQuery().starts_at(slate)
+            )
 
         return render_template(
             'info/upcoming_games.html',
             query_string=process_args(request),
-            start_time=games[0].local_start_time,
+            start_time=next_games[0].local_start_time if next_games else None,
             upcoming_games=next_games
         )
 
 
-    def sync(self):
-        live = self.db.update_game_states()
+    def stream_games(self):
+        with self._watch_lock:
+            if self._game_rows is None:
+                self._remember_game_rows(self._read_game_rows())
+                self.game_watcher.start()
+        subscription = self.game_stream.subscribe()
+
+        def events():
+            try:
+                yield 'retry: 5000\n\n'
+                yield from subscription
+            finally:
+                subscription.close()
+
+        return Response(
+            events(),
+            mimetype='text/event-stream',
+            headers={
+                'Cache-Control': 'no-cache',
+                'X-Accel-Buffering': 'no'
+            }
+        )
+
+
+    def _read_game_rows(self, after_rowid=0) -> dict:
+        # the games that can still change on their own, FUT games change
+        # when they start and COMPILED ones never do, and any game added
+        # after after_rowid
+        query = JoinGamesQuery().where(
+            "g.status NOT IN ('FUT', 'COMPILED') OR g.rowid>?",
+            after_rowid
+        )
+        return {game.rowid: game for game in self.db.get_join_games(query=query)}
+
+
+    def _publish_changes(self):
+        # runs on the watcher thread. Rows that changed are pushed to their
+        # game-<rowid> listeners, and a 'games' event asks the tables to
+        # reload when games were added or changed status, since that can
+        # move them in or out of a table's filter
+        if self.game_stream.subscribers == 0:
+            return
+        previous = self._game_rows
+        rows = self._read_game_rows(self._last_game_rowid)
+        # games that left the snapshot were compiled since the last poll,
+        # read once more for their final score and status
+        settled = [rowid for rowid in previous if rowid not in rows]
+        if settled:
+            query = JoinGamesQuery().game_rowids(settled)
+            rows.update(
+                (game.rowid, game)
+                for game in self.db.get_join_games(query=query)
+            )
+
+        changed = [
+            game for rowid, game in rows.items()
+            if previous.get(rowid) != game
+        ]
+        for game in changed:
+            self._publish_game(game)
+        if any(
+            previous.get(game.rowid) is None
+            or previous[game.rowid].status != game.status
+            for game in changed
+        ):
+            self.game_stream.publish(sse_message('games', 'changed'))
+        self._remember_game_rows(rows)
+
+
+    def _remember_game_rows(self, rows):
+        # only games that can still change are diffed on the next poll
+        self._last_game_rowid = max(self._last_game_rowid, *rows)
+        self._game_rows = {
+            rowid: game for rowid, game in rows.items()
+            if game.status not in ('FUT', 'COMPILED')
+        }
+
+
+    def _publish_game(self, game):
+        with self.app.app_context():
+            # the same macro games.html renders its rows with
+            game_row = get_template_attribute(
+                'database/game_row.html',
+                'game_row'
+            )
+            html = str(game_row(game))
+        self.game_stream.publish(sse_message(f'game-{game.rowid}', html))
+
+
+    def _conditional(self, tables, render, variant=None):
+        # answers If-None-Match with a 304 before touching the database or
+        # jinja when none of the tables behind the view have been written.
+        # variant is anything else the rendered html depends on
+        signature = changes.signature(self.db.games.db_dir, *tables)
+        if variant is not None:
+            signature = f'{signature}|{variant}'
+        etag = sha1(
+            f'{request.full_path}|{signature}'.encode()
+        ).hexdigest()
+
+        if etag in request.if_none_match:
+            response = make_response('', 304)
+        else:
+            response = make_response(
+                self._cached_render(tables, signature, render)
+            )
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+
+
+    def _cached_render(self, tables, signature, render):
+        key = (
+            request.endpoint,
+            tuple(sorted(request.args.items(multi=True))),
+            signature
+        )
+        if (html := self.fragments.get(key)) is None:
+            html = render()
+            self.fragments.put(key, html, tables)
+        return html
+
+
+    def cache_stats(self):
+        return self.fragments.stats
 
-        for status in ['FINAL', 'IMPORTED']:
-            self.db.update_games_by_status(status)
+
+    def sync(self):
+        # with a scheduler running this only reports its last sync
+        if self.scheduler is None:
+            live = self.db.sync()
+            timestamp = now()
+            status = {'live': live}
+        else:
+            status = self.scheduler.status
+            live = status['live']
+            timestamp = (
+                from_timestamp(status['last_sync'])
+                if status['last_sync'] is not None
+                else 'never'
+            )
 
         if 'footer' in request.args.keys():
             return render_template(
                 'tools/sync_object.html',
                 refresh=5 if live else 20,
-                timestamp=now()
+                timestamp=timestamp
             )
 
-        return {'success': True, 'live': live}
+        return {'success': True, **status}
         
 
 ###############################################################################
@@ -140,6 +351,15 @@ def now():
     return datetime.now(tz).strftime(format)
 
 
+def from_timestamp(timestamp):
+    return datetime.fromtimestamp(timestamp, tz).strftime(format)
+
+
+def split_arg(value):
+    # 'LIVE,FINAL,' -> ['LIVE', 'FINAL']
+    return [item for item in value.split(',') if item != '']
+
+
 def process_args(request):
     query_string = '?'
     for key, value in request.args.items():
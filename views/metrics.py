@@ -0,0 +1,73 @@
+from time import perf_counter
+
+from flask import request, g, Response
+
+from utils.metrics import (
+    CONTENT_TYPE,
+    registry,
+    http_requests,
+    http_duration,
+    http_sql_statements
+)
+from utils.tracing import tracer
+
+
+###############################################################################
+
+
+class Metrics:
+    # times every request of the app and serves the process' metrics in the
+    # Prometheus text format
+    def __init__(self, app):
+        self.app = app
+        app.before_request(self._start)
+        app.after_request(self._finish)
+
+
+    def metrics(self):
+        return Response(registry.render(), content_type=CONTENT_TYPE)
+
+
+    def sql_trace(self):
+        # the sampled call sites that took the most time, when tracing is on
+        return {
+            'sample_rate': tracer.sample_rate,
+            'slow_threshold': tracer.slow_threshold,
+            'slow_queries': tracer.slow_queries,
+            'sites': tracer.report(int(request.args.get('limit', 50)))
+        }
+
+
+    #::::::::::::::::::::::::::::::::::::::::::::::::::::::#
+
+
+    def _start(self):
+        g.metrics_start = perf_counter()
+        tracer.begin_scope()
+
+
+    def _finish(self, response):
+        start = g.pop('metrics_start', None)
+        if start is None:
+            return response
+        statements = tracer.end_scope()
+
+        # the rule, not the path, so query strings and ids share a series
+        rule = request.url_rule
+        route = rule.rule if rule is not None else 'unmatched'
+        http_duration.observe(
+            perf_counter() - start,
+            route=route,
+            method=request.method
+        )
+        http_requests.inc(
+            route=route,
+            method=request.method,
+            status=response.status_code
+        )
+        http_sql_statements.observe(statements, route=route)
+        response.headers['X-SQL-Statements'] = str(statements)
+        return response
+
+
+###############################################################################